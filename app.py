@@ -1,4 +1,5 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import os
 import re
 import sys
@@ -7,18 +8,26 @@ from pathlib import Path
 import zipfile
 from io import BytesIO
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime
 import gc
-import hashlib
+import shutil
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
 # model モジュールをインポート可能にするためのパスの追加
 current_dir = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(current_dir, 'model')
 sys.path.insert(0, model_path)
 
-from model.extract_labels import extract_labels
-from model.common_utils import save_uploadedfile, cleanup_stale_temp_files
+# DXF 処理系（model.extract_labels / model.diff_export）は ezdxf を読み込むため、
+# 使用する関数内で遅延インポートする（2026-07 変更。アップロード前の初回表示を速くする）
+from model.common_utils import (
+    save_uploadedfile, uploaded_file_digest, cleanup_stale_temp_files, create_session_temp_dir,
+    TEMP_FILE_PREFIX, get_excel_read_engine,
+)
 from model import pairing
 from model.pairing import build_pairs, build_pairs_from_list, primary_status_by_drawing
 from model.master_ledger import (
@@ -28,10 +37,9 @@ from model.master_ledger import (
     save_master_to_bytes,
     make_dataframe_arrow_compatible,
 )
-from model.diff_export import create_diff_zip, DIFF_LABELS_FILENAME, UNCHANGED_LABELS_FILENAME
 
 # 設定をインポート
-from config import ui_config, diff_config, help_text
+from config import ui_config, diff_config, extraction_config, help_text
 
 st.set_page_config(
     page_title="DXF Diff Manager",
@@ -47,16 +55,16 @@ MODULE_PATTERN = re.compile(r'^[A-Z0-9]{4}$')              # 例: XXXX（英大
 SIDE_PATTERN = re.compile(r'^[A-Z0-9]{3}$')                # 例: XXX（英大文字・数字）
 
 
-def read_zip_member(zip_data, member_name):
-    """zip_data（bytes）からメンバーを読み出す。存在しない場合は None。
+def read_zip_member(zip_path, member_name):
+    """zip_path（一時ZIPファイル）からメンバーを読み出す。存在しない場合は None。
 
     diff_labels.xlsx / unchanged_labels.xlsx を session_state に二重保持しないため、
-    プレビュー表示時に zip_data から都度読み出す用途で使う。
+    プレビュー表示時に ZIP から都度読み出す用途で使う。
     """
-    if not zip_data:
+    if not zip_path or not os.path.exists(zip_path):
         return None
     try:
-        with zipfile.ZipFile(BytesIO(zip_data)) as zf:
+        with zipfile.ZipFile(zip_path) as zf:
             if member_name in zf.namelist():
                 return zf.read(member_name)
     except Exception:
@@ -64,15 +72,95 @@ def read_zip_member(zip_data, member_name):
     return None
 
 
-def load_default_prefixes():
-    if PREFIX_CONFIG_PATH.exists():
-        with open(PREFIX_CONFIG_PATH, 'r', encoding='utf-8') as f:
-            lines = [line.rstrip('\n') for line in f]
-        return [line for line in lines if line.strip()]
-    return []
+def get_file_mtime_ns(path):
+    """ファイルの更新時刻（ns）を返す。存在しない場合は None（キャッシュキー用）"""
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def read_file_bytes(path):
+    """ファイル全体をバイト列として読み込む（ダウンロードボタンの遅延生成用）"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_zip_excel_sheet_names(zip_path, member_name, zip_mtime_ns):
+    """ZIP 内のExcelメンバーのシート名一覧を返す（メンバーが無ければ空リスト）。
+
+    プレビューの expander は折りたたみ中もリランのたびに実行されるため、ZIP からの
+    読み出しとExcelの解析を st.cache_data で保持する（2026-07 追加）。zip_mtime_ns は
+    キャッシュキーにのみ使い、同じパスに別のZIPが書き出された場合に古い結果を返さない。
+    python-calamine があれば台帳の読み込みと同じく calamine で読む（2026-07 追加）。
+    """
+    excel_bytes = read_zip_member(zip_path, member_name)
+    if not excel_bytes:
+        return []
+    return pd.ExcelFile(BytesIO(excel_bytes), engine=get_excel_read_engine()).sheet_names
+
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_zip_excel_sheet(zip_path, member_name, zip_mtime_ns, sheet_name, nrows=None):
+    """ZIP 内のExcelメンバーの1シートを DataFrame として返す（キャッシュは上と同じ方針）。
+
+    nrows を指定するとプレビューに必要な先頭行だけを読む（2026-07 追加）。
+    """
+    excel_bytes = read_zip_member(zip_path, member_name)
+    return pd.read_excel(BytesIO(excel_bytes), sheet_name=sheet_name, nrows=nrows,
+                         engine=get_excel_read_engine())
+
+
+def get_session_temp_dir():
+    """このセッションの一時ファイルを置くディレクトリを返す（未作成・削除済みなら作成する）。
+
+    アップロードDXF・差分ZIPの一時ファイルを1つのディレクトリにまとめ、
+    リスタート時にディレクトリごと削除できるようにする（2026-07 追加）。
+    session_state を参照するためメインスレッドから呼ぶこと。
+    """
+    temp_dir = st.session_state.get('_tmpdir')
+    if not temp_dir or not os.path.isdir(temp_dir):
+        temp_dir = create_session_temp_dir()
+        st.session_state['_tmpdir'] = temp_dir
+    return temp_dir
 
-DEFAULT_PREFIXES = load_default_prefixes()
+
+def create_zip_output_path():
+    """差分ZIPの書き出し先となる一時ファイルのパスを作成する。
+
+    ZIP全体を session_state に bytes で保持するとペア数に比例してメモリを
+    占有するため、ディスク上の一時ファイルに書き出してパスだけを保持する
+    （2026-07 追加）。接頭辞を揃えて cleanup_stale_temp_files の掃除対象にする。
+    """
+    with tempfile.NamedTemporaryFile(delete=False, dir=get_session_temp_dir(),
+                                     prefix=TEMP_FILE_PREFIX, suffix='.zip') as tmp:
+        return tmp.name
+
+
+def remove_zip_output():
+    """session_state に保持している差分ZIPの一時ファイルを削除する"""
+    zip_path = st.session_state.get('zip_path')
+    if zip_path and os.path.exists(zip_path):
+        try:
+            os.unlink(zip_path)
+        except Exception:
+            pass  # エラーは無視
+
+
+@st.cache_data(show_spinner=False)
+def load_default_prefixes():
+    """prefix_config.txt から初期プレフィックスリストを読み込む（空行は除外）。
+
+    app.py はリランのたびに再実行されるため、モジュールレベルで読み込むと操作のたびに
+    ファイルを読むことになる。新規セッションの初期化時にだけ呼び、結果は st.cache_data で
+    プロセス内に保持する（2026-07 変更。ファイルを変更した場合はアプリの再起動が必要）。
+    各行の前後の空白は get_prefix_list_from_state() と同じく取り除く。
+    """
+    if not PREFIX_CONFIG_PATH.exists():
+        return []
+    return [line.strip() for line in PREFIX_CONFIG_PATH.read_text(encoding='utf-8').splitlines()
+            if line.strip()]
 
 
 def cleanup_temp_files():
@@ -89,14 +177,75 @@ def cleanup_temp_files():
                         os.unlink(temp_path)
                     except Exception:
                         pass  # エラーは無視
+    remove_zip_output()
+    # セッション用一時ディレクトリはディレクトリごと削除する（次回の保存時に作り直される）
+    temp_dir = st.session_state.pop('_tmpdir', None)
+    if temp_dir:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def is_temp_path_in_use(temp_path):
+    """いずれかのファイル辞書が temp_path を参照しているかどうか。
+
+    一時ファイルは内容ハッシュで命名され同一内容のアップロード間で共有されるため、
+    上書き時に古いファイルを削除する前に他からの参照がないことを確認する。
+    """
+    for dict_key in ('source_files_dict', 'dest_files_dict',
+                     'all_files_dict', 'all_in_one_files_dict'):
+        for file_info in st.session_state.get(dict_key, {}).values():
+            if file_info.get('temp_path') == temp_path:
+                return True
+    return False
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_master_cached(master_bytes):
+    """アップロードされた図面管理台帳をファイル内容をキーに読み込む（2026-07 追加）。
+
+    同じ台帳を別セッションや「新しい差分抽出を開始」後に再アップロードした場合、
+    また読み込みエラーの台帳がアップロードされたままリランが続く場合に、Excel の
+    再解析を省く。台帳は大きくなりうるため件数の上限を小さくする。戻り値は
+    load_parent_child_master() と同じ (DataFrame または None, エラーメッセージ または None)。
+    """
+    return load_parent_child_master(BytesIO(master_bytes))
+
+
+@lru_cache(maxsize=32)
+def _parse_prefixes(text_value):
+    """先頭文字列のテキスト（1行1件）を空行を除いたタプルにする。
+
+    テキストエリアはリランのたびに読み直されるが、内容が変わらない限り同じタプルを
+    返す（2026-07 追加）。st.cache_data は呼び出しごとに戻り値を複製するため、
+    小さなテキストの解析には lru_cache を使う。タプルは filter_unchanged_by_prefix()
+    でそのまま str.startswith() に渡せる。
+    """
+    return tuple(line.strip() for line in text_value.splitlines() if line.strip())
 
 
 def get_prefix_list_from_state():
-    text_value = st.session_state.get('prefix_text_input', "")
-    return [line.strip() for line in text_value.splitlines() if line.strip()]
+    return _parse_prefixes(st.session_state.get('prefix_text_input', ""))
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _extract_source_drawing_number_cached(file_hash, filename, _temp_path):
+    """DXF から流用元図番を抽出する（ファイル内容のハッシュとファイル名をキーにキャッシュ）。
+
+    st.cache_data はセッション・リラン・「新しい差分抽出」をまたいで保持されるため、
+    同じDXFを再アップロードした場合は ezdxf による再解析を丸ごと省略できる
+    （2026-07 追加。以前は session_state の辞書で同一セッション内のみキャッシュしていた）。
+    _temp_path は引数名の先頭 _ によりキャッシュキーから除外される（保存先はセッションごとに異なるため）。
+    キャッシュはサーバープロセス全体で共有されるため、max_entries で件数の上限を設ける。
+    読み込み・解析に失敗した場合は extract_drawing_numbers_only() の例外がそのまま伝わる。
+    st.cache_data は例外を送出した呼び出しを保存しないため、失敗が None として
+    キャッシュされ、以降の同じファイルのアップロードで再解析されなくなることはない。
+    """
+    from model.extract_labels import extract_drawing_numbers_only
 
+    info = extract_drawing_numbers_only(_temp_path, original_filename=filename)
+    return info.get('source_drawing_number')
 
-def extract_source_number_from_dest_file(uploaded_file):
+
+def extract_source_number_from_dest_file(uploaded_file, temp_dir=None):
     """
     流用先DXFファイルを処理する。
     図番（main_drawing_number）はファイル名から取得し、
@@ -104,48 +253,30 @@ def extract_source_number_from_dest_file(uploaded_file):
 
     Args:
         uploaded_file: アップロードファイル・オブジェクト
+        temp_dir: 一時ファイルの保存先（セッション用一時ディレクトリ）
+
+    ワーカースレッドから呼ばれるため st.* は呼ばない。解析エラーは例外のまま
+    送出し、呼び出し元（process_all_uploaded_files）がメインスレッドで表示する。
 
     Returns:
-        dict or None
+        dict
     """
-    try:
-        drawing_number = Path(uploaded_file.name).stem
-        file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
-        temp_path = save_uploadedfile(uploaded_file)
-
-        cache = st.session_state.get('drawing_info_cache', {})
-        cached_info = cache.get(file_hash)
+    drawing_number = Path(uploaded_file.name).stem
+    # キャッシュキー用の内容ハッシュ。保存ファイル名にも同じ値を使い、ファイル全体の
+    # ハッシュ計算を1回にする
+    file_hash = uploaded_file_digest(uploaded_file)
+    temp_path = save_uploadedfile(uploaded_file, dir=temp_dir, digest=file_hash)
 
-        if cached_info:
-            source_drawing = cached_info.get('source_drawing_number')
-        else:
-            _, info = extract_labels(
-                temp_path,
-                filter_non_parts=False,
-                sort_order="none",
-                debug=False,
-                selected_layers=None,
-                validate_ref_designators=False,
-                extract_drawing_numbers_option=True,
-                extract_title_option=False,
-                original_filename=uploaded_file.name
-            )
-            source_drawing = info.get('source_drawing_number')
-            cache[file_hash] = {'source_drawing_number': source_drawing}
-            st.session_state.drawing_info_cache = cache
-
-        return {
-            'filename': uploaded_file.name,
-            'temp_path': temp_path,
-            'main_drawing_number': drawing_number,
-            'source_drawing_number': source_drawing,
-            'title': None,
-            'subtitle': None,
-        }
+    source_drawing = _extract_source_drawing_number_cached(file_hash, uploaded_file.name, temp_path)
 
-    except Exception as e:
-        st.error(f"ファイル {uploaded_file.name} の処理中にエラーが発生しました: {str(e)}")
-        return None
+    return {
+        'filename': uploaded_file.name,
+        'temp_path': temp_path,
+        'main_drawing_number': drawing_number,
+        'source_drawing_number': source_drawing,
+        'title': None,
+        'subtitle': None,
+    }
 
 
 def create_pair_list(source_files_dict, dest_files_dict, progress_callback=None):
@@ -188,10 +319,10 @@ def load_pair_list(uploaded_file):
         return None
 
 
-def _extract_by_filename(uploaded_file):
+def _extract_by_filename(uploaded_file, temp_dir=None):
     """ファイル名（拡張子なし）を図番として使用するシンプルな抽出関数"""
     drawing_number = Path(uploaded_file.name).stem
-    temp_path = save_uploadedfile(uploaded_file)
+    temp_path = save_uploadedfile(uploaded_file, dir=temp_dir)
     return {
         'filename': uploaded_file.name,
         'temp_path': temp_path,
@@ -232,6 +363,10 @@ def initialize_session_state():
         cleanup_stale_temp_files()
         st.session_state['_stale_tmp_swept'] = True
 
+    if '_tmpdir' not in st.session_state:
+        # アップロードDXF・差分ZIPの一時ファイルはこのディレクトリにまとめる
+        get_session_temp_dir()
+
     if 'step0_mode' not in st.session_state:
         st.session_state.step0_mode = 'new'
 
@@ -287,10 +422,7 @@ def initialize_session_state():
         st.session_state.dest_upload_summary = None
 
     if 'prefix_text_input' not in st.session_state:
-        st.session_state.prefix_text_input = "\n".join(DEFAULT_PREFIXES)
-
-    if 'drawing_info_cache' not in st.session_state:
-        st.session_state.drawing_info_cache = {}
+        st.session_state.prefix_text_input = "\n".join(load_default_prefixes())
 
     # ペアリストモード用
     if 'step1_mode' not in st.session_state:
@@ -415,6 +547,34 @@ def get_brand_new_drawing_pairs(all_pairs, mode):
     )
 
 
+def cached_display_table(cache_key, source, build_rows):
+    """表示用の表（pyarrow.Table）を source が差し替わるまで再利用する。
+
+    st.dataframe に list-of-dicts を渡すと、リランのたびに pandas 経由で Arrow へ
+    変換される。ペア一覧などは source（st.session_state.pairs 等。再生成時は
+    オブジェクトごと置き換わる）が同じ限り内容も同じなので、一度作った Arrow 表を
+    session_state に保持して使い回す（2026-07 追加）。
+
+    Args:
+        cache_key: 表の識別キー（source から表を作る条件を含める。例: (表名, mode)）
+        source: 表の元データ。同一オブジェクト（is）である限りキャッシュを返す
+        build_rows: 行（dict）のリストを返す関数。キャッシュが無効な場合のみ呼ぶ
+    """
+    cache = st.session_state.setdefault('_display_table_cache', {})
+    entry = cache.get(cache_key)
+    if entry is not None and entry[0] is source:
+        return entry[1]
+    rows = build_rows()
+    try:
+        table = pa.Table.from_pylist(rows)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # 数値と '-' 等の文字列が混在する列は、表示用に文字列へ統一してから変換する
+        display_df = make_dataframe_arrow_compatible(pd.DataFrame(rows))
+        table = pa.Table.from_pandas(display_df, preserve_index=False)
+    cache[cache_key] = (source, table)
+    return table
+
+
 def render_pair_list():
     """ペアリストを表示
 
@@ -470,13 +630,11 @@ def render_pair_list():
     if complete_pairs:
         st.success(f"差分抽出が可能なペア：{len({p['main_drawing'] for p in complete_pairs})}件")
 
-        pair_data = []
-        for pair in complete_pairs:
-            pair_data.append({
-                '流用先（新）': pair['main_drawing'],
-                '流用元（旧）': pair['source_drawing'],
-                '関係': pair.get('relation', 'なし'),
-            })
+        pair_data = cached_display_table(('pair_data', mode), all_pairs, lambda: [{
+            '流用先（新）': pair['main_drawing'],
+            '流用元（旧）': pair['source_drawing'],
+            '関係': pair.get('relation', 'なし'),
+        } for pair in complete_pairs])
 
         st.dataframe(pair_data, width='stretch', hide_index=True)
 
@@ -498,11 +656,11 @@ def render_pair_list():
         }
         missing_file_pairs = missing_pairs + missing_target_pairs + missing_both_pairs + one_sided_pairs
         if missing_file_pairs:
-            missing_file_data = [{
+            missing_file_data = cached_display_table(('missing_file_data', mode), all_pairs, lambda: [{
                 '流用先（新）': pair['main_drawing'] or '（なし）',
                 '流用元（旧）': pair['source_drawing'] or '（なし）',
                 'ステータス': status_text[pair['status']],
-            } for pair in missing_file_pairs]
+            } for pair in missing_file_pairs])
 
             # 件数は行数（ペアリストの行＝宣言された関係の数）で数える。one_sided は
             # main_drawing が空（複数行が同じ空値に collapse する）ため、main_drawing
@@ -514,24 +672,28 @@ def render_pair_list():
         # missing_target/missing_both は方式C専用のステータスのため常に空）。
         # 同じ流用先に RevUp の差分抽出可能ペアがある場合は、その流用元図番を併記する。
         if missing_pairs:
-            revup_source_by_target = {
-                p['main_drawing']: p['source_drawing']
-                for p in complete_pairs
-                if p.get('relation') == 'RevUp'
-            }
-            missing_data = []
-            for pair in missing_pairs:
-                revup_source = revup_source_by_target.get(pair['main_drawing'])
-                if revup_source:
-                    status = f'⚠️ 流用元の図面ファイルなし・RevUpあり（{revup_source}）'
-                else:
-                    status = '⚠️ 流用元の図面ファイルなし'
-                missing_data.append({
-                    '流用先（新）': pair['main_drawing'],
-                    '流用元（旧）': pair['source_drawing'],
-                    '関係': pair.get('relation', 'なし'),
-                    'ステータス': status
-                })
+            def build_missing_rows():
+                revup_source_by_target = {
+                    p['main_drawing']: p['source_drawing']
+                    for p in complete_pairs
+                    if p.get('relation') == 'RevUp'
+                }
+                missing_rows = []
+                for pair in missing_pairs:
+                    revup_source = revup_source_by_target.get(pair['main_drawing'])
+                    if revup_source:
+                        status = f'⚠️ 流用元の図面ファイルなし・RevUpあり（{revup_source}）'
+                    else:
+                        status = '⚠️ 流用元の図面ファイルなし'
+                    missing_rows.append({
+                        '流用先（新）': pair['main_drawing'],
+                        '流用元（旧）': pair['source_drawing'],
+                        '関係': pair.get('relation', 'なし'),
+                        'ステータス': status
+                    })
+                return missing_rows
+
+            missing_data = cached_display_table(('missing_data', mode), all_pairs, build_missing_rows)
 
             with st.expander(f"⚠️ 流用元図番の図面がない図面：{len({p['main_drawing'] for p in missing_pairs})}件", expanded=False):
                 st.dataframe(missing_data, width='stretch', hide_index=True)
@@ -541,13 +703,11 @@ def render_pair_list():
 
     # 完全新規図面（流用元図番なし）
     if no_source_pairs:
-        no_source_data = []
-        for pair in no_source_pairs:
-            no_source_data.append({
-                '図番': pair['main_drawing'],
-                '関係': '完全新規図面',
-                'ステータス': '流用元図番の指定なし'
-            })
+        no_source_data = cached_display_table(('no_source_data', mode), all_pairs, lambda: [{
+            '図番': pair['main_drawing'],
+            '関係': '完全新規図面',
+            'ステータス': '流用元図番の指定なし'
+        } for pair in no_source_pairs])
 
         with st.expander(f"完全新規図面（流用元図番なし）：{len(no_source_pairs)}件", expanded=False):
             st.dataframe(no_source_data, width='stretch', hide_index=True)
@@ -570,8 +730,16 @@ def render_pair_list():
 
     return complete_pairs
 
-def render_preview_dataframe(df, key_prefix):
-    """プレビュー用データフレームの列幅を調整して表示"""
+def render_preview_dataframe(df, key_prefix, max_rows=None):
+    """プレビュー用データフレームの列幅を調整して表示
+
+    max_rows を指定すると先頭 max_rows 行だけをブラウザへ送る（2026-07 追加。
+    st.dataframe はリランのたびに表全体を送信するため、大きなシートで表示が重くなる）。
+    呼び出し側は超過の有無を判定できるよう max_rows + 1 行まで読んで渡せばよい。
+    """
+    if max_rows is not None and len(df) > max_rows:
+        st.caption(f"先頭 {max_rows:,} 行を表示しています（すべての行はダウンロードしたファイルで確認してください）。")
+        df = df.head(max_rows)
     display_df = make_dataframe_arrow_compatible(df)
     column_config = {
         col: st.column_config.Column(col, width="small")
@@ -591,7 +759,7 @@ def render_preview_dataframe(df, key_prefix):
 def render_help_section():
     """プログラム説明セクションを表示"""
     with st.expander("ℹ️ プログラム説明", expanded=False):
-        st.info("\n".join(help_text.USAGE_STEPS))
+        st.info(help_text.USAGE_TEXT)
 
 
 def process_all_uploaded_files(groups):
@@ -629,31 +797,55 @@ def process_all_uploaded_files(groups):
     # グループごとの集計用
     group_results = {id(g): {'processed': 0, 'failed': []} for _, g in all_items}
 
-    for idx, (uploaded_file, group) in enumerate(all_items, start=1):
-        extractor = group['extractor']
-        file_info = extractor(uploaded_file)
-        gid = id(group)
-        if file_info:
-            main_drawing = file_info['main_drawing_number']
-            # 同じ図番への再アップロードで上書きする場合、古い一時ファイルが孤立しないよう削除する
-            old_info = group['files_dict'].get(main_drawing)
-            if old_info:
-                old_path = old_info.get('temp_path')
-                if old_path and old_path != file_info.get('temp_path') and os.path.exists(old_path):
-                    try:
-                        os.unlink(old_path)
-                    except Exception:
-                        pass
-            group['files_dict'][main_drawing] = file_info
-            group_results[gid]['processed'] += 1
-        else:
-            group_results[gid]['failed'].append(uploaded_file.name)
+    # session_state はワーカースレッドから参照できないため、保存先はここで確定させて渡す
+    temp_dir = get_session_temp_dir()
+
+    def run_extractor(uploaded_file, extractor):
+        # ワーカースレッドでは st.* を呼ばず、エラーは文字列で返してメインスレッドで表示する
+        try:
+            return extractor(uploaded_file, temp_dir), None
+        except Exception as e:
+            return None, f"ファイル {uploaded_file.name} の処理中にエラーが発生しました: {str(e)}"
+
+    # 図番抽出（DXF解析・一時ファイル保存）はファイルごとに独立しているため、スレッドプールで
+    # 並行実行する（2026-07 追加。ファイルI/Oの待ち時間を重ねられる）。結果は投入順に
+    # 受け取り、files_dict への格納・進捗表示・エラー表示はメインスレッドで従来と同じ順序で行う。
+    # extract_source_number_from_dest_file は st.cache_data 付きの関数を呼ぶため、ワーカー
+    # スレッドにもスクリプトの ScriptRunContext を引き継ぐ（無いと Streamlit のキャッシュが
+    # スレッドごとに "missing ScriptRunContext" の警告を出す）
+    max_workers = max(1, min(extraction_config.MAX_EXTRACT_WORKERS, total_files))
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=add_script_run_ctx,
+                            initargs=(None, get_script_run_ctx())) as executor:
+        futures = [executor.submit(run_extractor, uploaded_file, group['extractor'])
+                   for uploaded_file, group in all_items]
+
+        for idx, ((uploaded_file, group), future) in enumerate(zip(all_items, futures), start=1):
+            file_info, error_message = future.result()
+            if error_message:
+                st.error(error_message)
+            gid = id(group)
+            if file_info:
+                main_drawing = file_info['main_drawing_number']
+                old_info = group['files_dict'].get(main_drawing)
+                group['files_dict'][main_drawing] = file_info
+                # 同じ図番への再アップロードで上書きする場合、古い一時ファイルが孤立しないよう削除する
+                # （同一内容の別アップロードと共有している場合は残す）
+                if old_info:
+                    old_path = old_info.get('temp_path')
+                    if old_path and os.path.exists(old_path) and not is_temp_path_in_use(old_path):
+                        try:
+                            os.unlink(old_path)
+                        except Exception:
+                            pass
+                group_results[gid]['processed'] += 1
+            else:
+                group_results[gid]['failed'].append(uploaded_file.name)
 
-        elapsed = time.time() - start_time
-        progress_bar.progress(
-            min(idx / total_files, 1.0),
-            text=f"{idx}/{total_files}件の図番を抽出中...（経過 {elapsed:.1f} 秒）"
-        )
+            elapsed = time.time() - start_time
+            progress_bar.progress(
+                min(idx / total_files, 1.0),
+                text=f"{idx}/{total_files}件の図番を抽出中...（経過 {elapsed:.1f} 秒）"
+            )
 
     progress_placeholder.empty()
     elapsed_total = time.time() - start_time
@@ -805,7 +997,7 @@ def render_step0_master():
 
         if master_file is not None:
             if st.session_state.master_df is None or st.session_state.get('master_file_name') != master_file.name:
-                master_df, error_message = load_parent_child_master(master_file)
+                master_df, error_message = load_master_cached(master_file.getvalue())
                 if error_message:
                     st.error(error_message)
                 elif master_df is not None:
@@ -1006,9 +1198,10 @@ def _show_missing_drawings(pair_list_df, all_files_dict):
 
     ref_drawings = set()
     target_drawings = set()
-    for _, row in pair_list_df.iterrows():
-        ref = _norm(row['流用元図番'])
-        target = _norm(row['流用先図番'])
+    # 行ごとに Series を作る iterrows() を避け、2列を直接 zip で走査する（2026-07 変更）
+    for ref_value, target_value in zip(pair_list_df['流用元図番'], pair_list_df['流用先図番']):
+        ref = _norm(ref_value)
+        target = _norm(target_value)
         # 流用元と流用先が同一図番（identical）の行も、列に記載されている図番として
         # 未アップロード判定の対象に含める（2026-06修正。以前は比較対象外として
         # スキップしていたため、ファイルが無い「変更していない図面」宣言があっても
@@ -1265,9 +1458,9 @@ def render_step3_diff(complete_pairs):
             st.write("**レイヤー色設定**")
 
             # デフォルト値のインデックスを取得
-            deleted_default_index = next(i for i, (val, _) in enumerate(diff_config.COLOR_OPTIONS) if val == diff_config.DEFAULT_DELETED_COLOR)
-            added_default_index = next(i for i, (val, _) in enumerate(diff_config.COLOR_OPTIONS) if val == diff_config.DEFAULT_ADDED_COLOR)
-            unchanged_default_index = next(i for i, (val, _) in enumerate(diff_config.COLOR_OPTIONS) if val == diff_config.DEFAULT_UNCHANGED_COLOR)
+            deleted_default_index = diff_config.COLOR_INDEX[diff_config.DEFAULT_DELETED_COLOR]
+            added_default_index = diff_config.COLOR_INDEX[diff_config.DEFAULT_ADDED_COLOR]
+            unchanged_default_index = diff_config.COLOR_INDEX[diff_config.DEFAULT_UNCHANGED_COLOR]
 
             deleted_color = st.selectbox(
                 "削除図形の色（流用元図面のみ）",
@@ -1304,9 +1497,12 @@ def render_step3_diff(complete_pairs):
                 progress = current / total if total else 1.0
                 progress_bar.progress(min(progress, 1.0), text=f"{message}（{current}/{total}組）")
 
+            from model.diff_export import create_diff_zip
+
+            zip_path = create_zip_output_path()
             try:
                 step1_mode = st.session_state.step1_mode
-                zip_data, results, diff_labels_excel, unchanged_labels_excel, updated_master = create_diff_zip(
+                _, results, diff_labels_excel, unchanged_labels_excel, updated_master = create_diff_zip(
                     st.session_state.pairs,
                     master_df=st.session_state.master_df,
                     master_filename=st.session_state.master_file_name,
@@ -1325,13 +1521,16 @@ def render_step3_diff(complete_pairs):
                     total_drawings_count=compute_total_drawings_count(step1_mode),
                     source_drawing_numbers=set(st.session_state.source_files_dict.keys()),
                     dest_drawing_numbers=set(st.session_state.dest_files_dict.keys()),
+                    zip_output=zip_path,
                 )
 
                 # セッション状態に保存
-                # diff_labels.xlsx / unchanged_labels.xlsx は zip_data の中にも同内容が
+                # diff_labels.xlsx / unchanged_labels.xlsx は ZIP の中にも同内容が
                 # 含まれるため、二重に保持しない。プレビュー表示時に zip から読み出す
                 # （has_* フラグのみ保持し、実体のbytesはここでは持たない）。
-                st.session_state.zip_data = zip_data
+                # ZIP 自体も一時ファイルのパスのみ保持する。
+                remove_zip_output()
+                st.session_state.zip_path = zip_path
                 st.session_state.results = results
                 st.session_state.has_diff_labels = bool(diff_labels_excel)
                 st.session_state.has_unchanged_labels = bool(unchanged_labels_excel)
@@ -1351,6 +1550,8 @@ def render_step3_diff(complete_pairs):
             except Exception as e:
                 st.error(f"エラーが発生しました: {str(e)}")
                 st.error(traceback.format_exc())
+                if os.path.exists(zip_path):
+                    os.unlink(zip_path)
                 gc.collect()
             finally:
                 progress_placeholder.empty()
@@ -1363,6 +1564,8 @@ def render_step3_diff(complete_pairs):
     if 'results' in st.session_state and st.session_state.results:
         st.subheader("差分抽出結果")
 
+        from model.diff_export import DIFF_LABELS_FILENAME, UNCHANGED_LABELS_FILENAME
+
         results = st.session_state.results
         settings = st.session_state.get('processing_settings', {})
 
@@ -1377,9 +1580,8 @@ def render_step3_diff(complete_pairs):
         else:
             st.error("全てのペアで処理に失敗しました ❌")
 
-        # 結果詳細
-        result_data = []
-        for result in results:
+        # 結果詳細（results は差分抽出のたびに置き換わるため、それまでは表を再利用する）
+        def build_result_row(result):
             status = "✅ 成功" if result['success'] else "❌ 失敗"
             entity_counts = result.get('entity_counts')
 
@@ -1403,22 +1605,30 @@ def render_step3_diff(complete_pairs):
             row['未変更抽出ラベル数'] = result.get('unchanged_label_count', '-')
 
             row['ステータス'] = status
-            result_data.append(row)
+            return row
 
+        def build_result_rows():
+            return [build_result_row(result) for result in results]
+
+        result_data = cached_display_table(('result_data',), results, build_result_rows)
         st.dataframe(result_data, width='stretch', hide_index=True)
 
         # プレビューセクション
-        # diff_labels.xlsx / unchanged_labels.xlsx は zip_data 内から都度読み出す（二重保持しない）
+        # diff_labels.xlsx / unchanged_labels.xlsx は ZIP 内から読み出す（二重保持しない）。
+        # 解析結果は ZIP のパスと更新時刻をキーに st.cache_data で保持する（2026-07 変更）
+        zip_path = st.session_state.get('zip_path')
+        zip_mtime_ns = get_file_mtime_ns(zip_path)
         has_diff_labels = st.session_state.get('has_diff_labels', False)
         has_unchanged_labels = st.session_state.get('has_unchanged_labels', False)
-        preview_available = has_diff_labels or has_unchanged_labels or \
-                            st.session_state.master_df is not None
+        # 以降のプレビュー・ダウンロードで参照する値はここで一度だけ取り出す（2026-07 変更）
+        master_df = st.session_state.master_df
+        preview_available = has_diff_labels or has_unchanged_labels or master_df is not None
 
         if preview_available:
             st.subheader("出力内容プレビュー")
 
             preview_items = []
-            if st.session_state.master_df is not None:
+            if master_df is not None:
                 preview_items.append("図面管理台帳")
             if has_diff_labels:
                 preview_items.append("diff_labels.xlsx")
@@ -1427,9 +1637,18 @@ def render_step3_diff(complete_pairs):
             if preview_items:
                 st.caption("表示可能: " + ", ".join(preview_items))
 
-            if st.session_state.master_df is not None:
+            preview_rows = st.slider(
+                "プレビュー表示行数",
+                min_value=ui_config.PREVIEW_MIN_ROWS,
+                max_value=ui_config.PREVIEW_MAX_ROWS,
+                value=ui_config.PREVIEW_DEFAULT_ROWS,
+                step=50,
+                key="preview_max_rows",
+            )
+
+            if master_df is not None:
                 with st.expander("図面管理台帳プレビュー", expanded=False):
-                    render_preview_dataframe(st.session_state.master_df, "master_preview")
+                    render_preview_dataframe(master_df, "master_preview", max_rows=preview_rows)
 
             if has_diff_labels:
                 # 「一度開いたら開いたままにする」は、シート選択(selectbox)の変更という
@@ -1442,55 +1661,59 @@ def render_step3_diff(complete_pairs):
 
                 diff_expanded = st.session_state.get('diff_preview_expanded', False)
                 with st.expander("diff_labels.xlsx プレビュー", expanded=diff_expanded):
-                    diff_bytes = read_zip_member(st.session_state.zip_data, DIFF_LABELS_FILENAME)
-                    if diff_bytes:
-                        diff_xl = pd.ExcelFile(BytesIO(diff_bytes))
+                    diff_sheet_names = load_zip_excel_sheet_names(
+                        zip_path, DIFF_LABELS_FILENAME, zip_mtime_ns)
+                    if diff_sheet_names:
                         sheet_name = st.selectbox(
                             "シートを選択（diff_labels）",
-                            diff_xl.sheet_names,
+                            diff_sheet_names,
                             key="diff_labels_preview_sheet",
                             on_change=_mark_diff_preview_expanded,
                         )
-                        render_preview_dataframe(diff_xl.parse(sheet_name), "diff_preview")
+                        render_preview_dataframe(
+                            load_zip_excel_sheet(zip_path, DIFF_LABELS_FILENAME, zip_mtime_ns,
+                                                 sheet_name, nrows=preview_rows + 1),
+                            "diff_preview", max_rows=preview_rows)
 
             if has_unchanged_labels:
                 with st.expander("unchanged_labels.xlsx プレビュー", expanded=False):
-                    unchanged_bytes = read_zip_member(st.session_state.zip_data, UNCHANGED_LABELS_FILENAME)
-                    if unchanged_bytes:
-                        unchanged_xl = pd.ExcelFile(BytesIO(unchanged_bytes))
+                    unchanged_sheet_names = load_zip_excel_sheet_names(
+                        zip_path, UNCHANGED_LABELS_FILENAME, zip_mtime_ns)
+                    if unchanged_sheet_names:
                         sheet_name = st.selectbox(
                             "シートを選択（unchanged_labels）",
-                            unchanged_xl.sheet_names,
+                            unchanged_sheet_names,
                             key="unchanged_labels_preview_sheet"
                         )
-                        render_preview_dataframe(unchanged_xl.parse(sheet_name), "unchanged_preview")
+                        render_preview_dataframe(
+                            load_zip_excel_sheet(zip_path, UNCHANGED_LABELS_FILENAME, zip_mtime_ns,
+                                                 sheet_name, nrows=preview_rows + 1),
+                            "unchanged_preview", max_rows=preview_rows)
 
         # ダウンロードボタン
         if successful_count > 0:
             st.subheader("Step 5: 差分抽出ファイルのダウンロード")
 
             downloaded = st.session_state.get('downloaded', False)
-            st.download_button(
-                label="ZIPでダウンロード",
-                data=st.session_state.zip_data,
-                file_name="dxf_diff_results.zip",
-                mime="application/zip",
-                key="download_zip",
-                type="primary",
-                disabled=downloaded,
-                on_click=lambda: st.session_state.update({'downloaded': True})
-            )
+            if zip_path and os.path.exists(zip_path):
+                # data に bytes やファイルオブジェクトを渡すとリランのたびに ZIP 全体が
+                # メディアファイルマネージャへ読み込まれるため、クリック時にだけ読み込む
+                # callable を渡す（2026-07 変更。Streamlit 1.50 以降）
+                st.download_button(
+                    label="ZIPでダウンロード",
+                    data=partial(read_file_bytes, zip_path),
+                    file_name="dxf_diff_results.zip",
+                    mime="application/zip",
+                    key="download_zip",
+                    type="primary",
+                    disabled=downloaded,
+                    on_click=lambda: st.session_state.update({'downloaded': True})
+                )
+            else:
+                st.error("差分ZIPの一時ファイルが見つかりません。新しい差分抽出を開始してください。")
 
             # オプション設定の情報を表示
-            st.info(f"""
-                **生成されたファイルについて：**
-                - ADDED: 新図面にのみ存在する要素（追加された図形）
-                - DELETED: 旧図面にのみ存在する要素（削除された図形）
-                - UNCHANGED: 両方の図面に存在し変更がない図形
-                - diff_labels.xlsx: 各図面の変更ラベル一覧（シート名は新図面の図番）
-                - unchanged_labels.xlsx: 指定の先頭文字列に一致する未変更ラベル一覧
-                - 座標許容誤差: {settings.get('tolerance', 0.01)}
-                """)
+            st.info(help_text.OUTPUT_FILES_TEXT.format(tolerance=settings.get('tolerance', 0.01)))
 
         # 新しい比較を開始するボタン
         if st.button("🔄 新しい差分抽出を開始", key="restart_button"):
@@ -1501,7 +1724,6 @@ def render_step3_diff(complete_pairs):
             for key in ['source_files_dict', 'dest_files_dict',
                         'pairs', 'pairs_dirty',
                         'source_upload_key', 'dest_upload_key',
-                        'drawing_info_cache',
                         'source_upload_failures', 'dest_upload_failures',
                         'source_upload_summary', 'dest_upload_summary',
                         'pair_list_df', 'pair_list_file_name',
@@ -1509,10 +1731,10 @@ def render_step3_diff(complete_pairs):
                         'all_upload_failures', 'all_upload_summary',
                         'all_in_one_files_dict', 'all_in_one_upload_key',
                         'all_in_one_upload_failures', 'all_in_one_upload_summary',
-                        'results', 'zip_data', 'processing_settings',
+                        'results', 'zip_path', 'processing_settings',
                         'master_df', 'master_file_name', 'added_relationships_count',
                         'has_diff_labels', 'has_unchanged_labels',
-                        'diff_preview_expanded',
+                        'diff_preview_expanded', '_display_table_cache',
                         'downloaded']:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -1560,35 +1782,9 @@ def app():
     st.title(ui_config.TITLE)
     st.write(ui_config.SUBTITLE)
 
-    # 日本語の文字だけを英数字より小さく（94%）表示する。
-    # @font-face の unicode-range で日本語グリフ範囲だけ別フォント定義にし、
-    # size-adjust で縮小率を指定する（文字単位で自動的に使い分けられるため、
-    # ウィジェットごとのフォントサイズ指定は不要）。st.dataframe/Plotly の
-    # Canvas 描画部分には効かない場合がある。
-    st.markdown("""
-        <style>
-        /* 日本語グリフ専用のフォント定義: 94%縮小（ユーザー調整済み） */
-        @font-face {
-            font-family: "AppMixedFont";
-            src: local("Hiragino Kaku Gothic ProN"), local("Yu Gothic UI"),
-                 local("Yu Gothic"), local("Meiryo");
-            unicode-range: U+3000-303F,  /* 句読点・記号 */
-                           U+3040-30FF,  /* ひらがな・カタカナ */
-                           U+FF00-FFEF,  /* 全角英数・半角カナ */
-                           U+4E00-9FFF, U+3400-4DBF;  /* 漢字 */
-            size-adjust: 94%;
-        }
-        /* 上記範囲外（英数字）は通常サイズのフォントにフォールバック */
-        @font-face {
-            font-family: "AppMixedFont";
-            src: local("Source Sans Pro"), local("Helvetica Neue"), local("Arial");
-        }
-        .stApp, .stApp p, .stApp li, .stApp label, .stApp td, .stApp th,
-        .stApp h1, .stApp h2, .stApp h3, .stApp input, .stApp button {
-            font-family: "AppMixedFont", sans-serif !important;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    # 日本語の文字だけを縮小表示する CSS（内容は config.UIConfig.FONT_CSS）。
+    # st.markdown で注入した要素はリランごとに描画し直されるため、毎回発行する必要がある
+    st.markdown(ui_config.FONT_CSS, unsafe_allow_html=True)
 
     render_help_section()
     initialize_session_state()
@@ -12,10 +12,46 @@ class UIConfig:
     MASTER_FILE_TYPES = ["xlsx"]   # 図面管理台帳ファイルの拡張子
     DXF_FILE_TYPES = ["dxf"]       # DXFファイルの拡張子
 
+    # 出力内容プレビューの表示行数（スライダーの最小・最大・初期値。2026-07 追加）
+    PREVIEW_MIN_ROWS = 50
+    PREVIEW_MAX_ROWS = 2000
+    PREVIEW_DEFAULT_ROWS = 200
+
     # メッセージ設定
     TITLE = "DXF Diff Manager - 図面差分管理ツール"
     SUBTITLE = "アップロードしたDXFファイルからペアを抽出して、差分DXF図面とラベル差分リストを出力します。図面管理台帳も更新できます。"
 
+    # 日本語の文字だけを英数字より小さく（94%）表示する CSS。
+    # @font-face の unicode-range で日本語グリフ範囲だけ別フォント定義にし、
+    # size-adjust で縮小率を指定する（文字単位で自動的に使い分けられるため、
+    # ウィジェットごとのフォントサイズ指定は不要）。st.dataframe/Plotly の
+    # Canvas 描画部分には効かない場合がある。
+    # （2026-07 app.py から移動。app.py はリランのたびに再実行されるため）
+    FONT_CSS = """
+        <style>
+        /* 日本語グリフ専用のフォント定義: 94%縮小（ユーザー調整済み） */
+        @font-face {
+            font-family: "AppMixedFont";
+            src: local("Hiragino Kaku Gothic ProN"), local("Yu Gothic UI"),
+                 local("Yu Gothic"), local("Meiryo");
+            unicode-range: U+3000-303F,  /* 句読点・記号 */
+                           U+3040-30FF,  /* ひらがな・カタカナ */
+                           U+FF00-FFEF,  /* 全角英数・半角カナ */
+                           U+4E00-9FFF, U+3400-4DBF;  /* 漢字 */
+            size-adjust: 94%;
+        }
+        /* 上記範囲外（英数字）は通常サイズのフォントにフォールバック */
+        @font-face {
+            font-family: "AppMixedFont";
+            src: local("Source Sans Pro"), local("Helvetica Neue"), local("Arial");
+        }
+        .stApp, .stApp p, .stApp li, .stApp label, .stApp td, .stApp th,
+        .stApp h1, .stApp h2, .stApp h3, .stApp input, .stApp button {
+            font-family: "AppMixedFont", sans-serif !important;
+        }
+        </style>
+    """
+
 
 class DiffConfig:
     """差分比較関連の設定"""
@@ -40,6 +76,18 @@ class DiffConfig:
         (7, "7 - 白/黒"),
     ]
 
+    # 色番号 → COLOR_OPTIONS 内の位置（selectbox の初期選択用。2026-07 追加）
+    COLOR_INDEX = {val: i for i, (val, _) in enumerate(COLOR_OPTIONS)}
+
+    # 差分DXF生成の並列プロセス数の上限（2026-07 追加。実際の数はこのプロセスが使える
+    # CPU 数・ペア数も超えない）。ワーカーはそれぞれ ezdxf・pandas を読み込むため、
+    # 複数セッションが同時に実行してもメモリが膨らみすぎないよう抑える。1 以下なら
+    # プロセスプールを使わず逐次処理する
+    MAX_DIFF_WORKERS = 4
+    # プロセスプールを使う最小ペア数。これ未満のバッチはワーカーの起動コストに見合わない
+    # ため逐次処理する（2026-07 追加）
+    MIN_PAIRS_FOR_DIFF_WORKERS = 4
+
     # ZIPファイル名
     OUTPUT_ZIP_FILENAME = "dxf_diff_results.zip"
     MASTER_FILENAME = "Parent-Child_list.xlsx"
@@ -60,6 +108,9 @@ class ExtractionConfig:
     # RevUpペア設定
     RIGHTMOST_DRAWING_TOLERANCE = 100.0  # 右端図面判定の許容範囲
 
+    # アップロードDXFの図番抽出を並行実行するスレッド数の上限（2026-07 追加）
+    MAX_EXTRACT_WORKERS = 8
+
 
 class HelpText:
     """ヘルプテキスト"""
@@ -94,6 +145,22 @@ class HelpText:
         "- 図面管理台帳には、有効な比較図番ペアと完全新規作成図番のみが追加されます。"
     ]
 
+    # 表示用に連結済みのテキスト（2026-07 追加。app.py はリランのたびに再実行されるが、
+    # config はインポート時に一度だけ評価されるため、ここで連結しておく）
+    USAGE_TEXT = "\n".join(USAGE_STEPS)
+
+    # 差分抽出結果の「生成されたファイルについて」（2026-07 app.py から移動）。
+    # 実行時に変わるのは座標許容誤差だけのため、{tolerance} のみ format で埋める。
+    OUTPUT_FILES_TEXT = "\n".join([
+        "**生成されたファイルについて：**",
+        "- ADDED: 新図面にのみ存在する要素（追加された図形）",
+        "- DELETED: 旧図面にのみ存在する要素（削除された図形）",
+        "- UNCHANGED: 両方の図面に存在し変更がない図形",
+        "- diff_labels.xlsx: 各図面の変更ラベル一覧（シート名は新図面の図番）",
+        "- unchanged_labels.xlsx: 指定の先頭文字列に一致する未変更ラベル一覧",
+        "- 座標許容誤差: {tolerance}",
+    ])
+
 
 # 設定クラスのインスタンスを作成（簡単にアクセスできるように）
 ui_config = UIConfig()
@@ -1,18 +1,80 @@
 import os
+import shutil
+import hashlib
 import tempfile
 import time
 import re
+import importlib.util
 
 # このアプリが作成する一時ファイルの識別用prefix。
 # セッションが正常終了せず孤立した一時ファイルを安全に掃除する際の目印として使う。
 TEMP_FILE_PREFIX = "dxfdm_"
 
-def save_uploadedfile(uploadedfile):
-    """アップロードされたファイルを一時ディレクトリに保存する"""
-    with tempfile.NamedTemporaryFile(delete=False, prefix=TEMP_FILE_PREFIX,
-                                      suffix=os.path.splitext(uploadedfile.name)[1]) as f:
-        f.write(uploadedfile.getbuffer())
-        return f.name
+def uploaded_file_digest(uploadedfile):
+    """アップロードファイルの内容ハッシュ（BLAKE2b, 16バイトの16進文字列）を返す
+
+    暗号学的強度は不要なため sha256 より速い blake2b を使う。save_uploadedfile() の
+    保存ファイル名と、呼び出し側のキャッシュキーの両方に同じ値を使えるよう公開する
+    （2026-07 追加。以前は両者で別々にファイル全体をハッシュしていた）。
+    """
+    return hashlib.blake2b(uploadedfile.getbuffer(), digest_size=16).hexdigest()
+
+
+def save_uploadedfile(uploadedfile, dir=None, digest=None):
+    """アップロードされたファイルを一時ディレクトリに保存する
+
+    dir を指定した場合は、ファイル内容のハッシュ（uploaded_file_digest()）をファイル名として
+    dir 直下に保存する。同じ内容のファイルが保存済みであれば書き込みを省略して既存のパスを返す
+    （2026-07 追加。再アップロードや同一ファイルの重複アップロードで一時ファイルが
+    増え続けないようにするため）。dir 省略時は従来どおり毎回新しい一時ファイルを作成する。
+    digest に uploaded_file_digest() で計算済みの値を渡すと、ハッシュの再計算を省略する。
+    """
+    suffix = os.path.splitext(uploadedfile.name)[1]
+    data = uploadedfile.getbuffer()
+    if dir is None:
+        with tempfile.NamedTemporaryFile(delete=False, prefix=TEMP_FILE_PREFIX, suffix=suffix) as f:
+            f.write(data)
+            return f.name
+
+    if digest is None:
+        digest = uploaded_file_digest(uploadedfile)
+    path = os.path.join(dir, digest + suffix)
+    if not os.path.exists(path):
+        # 別スレッドが同じ内容を同時に保存しても読み手が書きかけのファイルを見ないよう、
+        # 同じディレクトリに書いてから os.replace で置き換える
+        with tempfile.NamedTemporaryFile(delete=False, dir=dir, prefix=TEMP_FILE_PREFIX,
+                                          suffix=suffix) as f:
+            f.write(data)
+        os.replace(f.name, path)
+    return path
+
+
+def create_session_temp_dir():
+    """セッション専用の一時ディレクトリを作成してパスを返す（2026-07 追加）
+
+    本アプリのprefixを付けるため、セッションが正常終了せず孤立した場合も
+    cleanup_stale_temp_files() の掃除対象になる。
+    """
+    return tempfile.mkdtemp(prefix=TEMP_FILE_PREFIX)
+
+
+def get_excel_read_engine():
+    """pd.read_excel / pd.ExcelFile に渡す読み込みエンジン名を返す。
+
+    python-calamine（Rust 実装）がインストールされていれば 'calamine' を返す。
+    純 Python の openpyxl より xlsx の読み込みが大幅に速いため。未インストールの
+    環境では None（pandas 既定の openpyxl）を返し、従来どおり動作させる。
+    engine='calamine' を受け付けるのは pandas 2.2 以降のため、それより古い pandas では
+    python-calamine がインストールされていても None を返す（2026-07 追加。本モジュールは
+    同期先プロジェクトでも使われ、pandas のバージョンを requirements で保証できないため）。
+    """
+    if importlib.util.find_spec('python_calamine') is None:
+        return None
+    import pandas as pd
+    major, minor = (int(part) for part in re.findall(r'\d+', pd.__version__)[:2])
+    if (major, minor) < (2, 2):
+        return None
+    return 'calamine'
 
 
 def cleanup_stale_temp_files(max_age_seconds=3 * 60 * 60):
@@ -23,6 +85,7 @@ def cleanup_stale_temp_files(max_age_seconds=3 * 60 * 60):
     ユーザーがリスタートを押さずにセッションを離脱した場合は回収されないまま残る。
     新しいセッション開始時に一度だけ呼び、本アプリのprefix付きファイルのうち
     十分古いもの（既存セッションが使用中である可能性が低いもの）だけを削除する。
+    create_session_temp_dir() で作成したセッション用ディレクトリも同じ基準で中身ごと削除する。
     """
     try:
         tmp_dir = tempfile.gettempdir()
@@ -32,7 +95,11 @@ def cleanup_stale_temp_files(max_age_seconds=3 * 60 * 60):
                 continue
             path = os.path.join(tmp_dir, name)
             try:
-                if os.path.isfile(path) and (now - os.path.getmtime(path)) > max_age_seconds:
+                if (now - os.path.getmtime(path)) <= max_age_seconds:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.isfile(path):
                     os.unlink(path)
             except Exception:
                 pass  # 他プロセスが使用中などのエラーは無視
@@ -4,10 +4,11 @@ import json
 import math
 from collections import defaultdict, Counter
 from pathlib import Path
-from typing import Dict, List, Tuple, Set, Optional, Any
+from typing import Dict, List, Tuple, Set, Optional, Any, Union, BinaryIO
 from decimal import Decimal, getcontext
 import logging
 import numpy as np
+import io
 import tempfile
 import os
 import gc
@@ -1070,10 +1071,15 @@ class OutputGenerator:
     
     def create_diff_dxf(self, entities_a: Dict, entities_b: Dict,
                         deleted_hashes: Set[str], added_hashes: Set[str],
-                        common_hashes: Set[str], output_file: str,
+                        common_hashes: Set[str], output_file: Union[str, BinaryIO],
                         linetype_patterns_a: Optional[Dict[str, Tuple[List[float], str]]] = None,
                         linetype_patterns_b: Optional[Dict[str, Tuple[List[float], str]]] = None):
-        """差分DXFファイルを作成"""
+        """差分DXFファイルを作成
+
+        output_file にはファイルパスのほか、バイナリのファイルオブジェクト（BytesIO 等）
+        も指定できる（2026-07 追加）。後者の場合はディスクへの書き出しと再読み込みを
+        行わずにストリームへ直接書き込む。
+        """
         try:
             # R2018以降でより良いUnicode対応
             new_doc = ezdxf.new('R2018', setup=True)
@@ -1123,6 +1129,19 @@ class OutputGenerator:
                                                           source_linetypes=linetype_patterns_a)
                         break  # 最初のインスタンスのみ
             
+            if hasattr(output_file, 'write'):
+                # ストリームへ saveas() と同じエンコーディング・エラー処理で書き込む。
+                # R2018 は常に UTF-8 で出力されるため、書き込み後の互換性確認
+                # （ファイルの再読み込み）は不要。
+                text_stream = io.TextIOWrapper(output_file, encoding=new_doc.output_encoding,
+                                               errors='dxfreplace')
+                try:
+                    new_doc.write(text_stream)
+                    text_stream.flush()
+                finally:
+                    text_stream.detach()  # 呼び出し元のストリームは閉じない
+                return True
+
             # DXFファイルを保存（UTF-8エンコーディングで日本語テキストを保持）
             new_doc.saveas(output_file)
             
@@ -1166,7 +1185,7 @@ class PairFileCache:
         return result
 
 
-def compare_dxf_files_and_generate_dxf(file_a: str, file_b: str, output_file: str,
+def compare_dxf_files_and_generate_dxf(file_a: str, file_b: str, output_file: Union[str, BinaryIO],
                                        tolerance: float = 0.05,
                                        deleted_color: int = 6,
                                        added_color: int = 4,
@@ -1186,7 +1205,8 @@ def compare_dxf_files_and_generate_dxf(file_a: str, file_b: str, output_file: st
     Args:
         file_a: 基準DXFファイルパス（旧図面。file_a のみに存在するエンティティが DELETED になる）
         file_b: 比較対象DXFファイルパス（新図面。file_b のみに存在するエンティティが ADDED になる）
-        output_file: 出力DXFファイルパス
+        output_file: 出力DXFファイルパス、またはバイナリのファイルオブジェクト（BytesIO 等。
+                    2026-07 追加。一時ファイルを経由せずメモリ上に出力する場合に使う）
         tolerance: 座標許容誤差
         deleted_color: 削除エンティティの色（デフォルト: 6=マゼンタ）
         added_color: 追加エンティティの色（デフォルト: 4=シアン）
@@ -7,13 +7,17 @@ streamlit には依存しないため、`tests/` から直接ユニットテス
 """
 import os
 import gc
+import shutil
 import tempfile
 import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
 from collections import defaultdict, Counter
 
 from .compare_dxf import compare_dxf_files_and_generate_dxf, count_entities_in_dxf_file, PairFileCache
 from .extract_labels import extract_labels
+from .common_utils import TEMP_FILE_PREFIX
 from .label_diff import (
     compute_label_differences,
     filter_unchanged_by_prefix,
@@ -21,12 +25,109 @@ from .label_diff import (
     build_unchanged_labels_workbook,
 )
 from .pairing import get_brand_new_drawing_pairs
-from .master_ledger import update_parent_child_master, save_master_to_bytes
+from .master_ledger import update_parent_child_master, write_master_excel
 from config import diff_config
 
 DIFF_LABELS_FILENAME = "diff_labels.xlsx"
 UNCHANGED_LABELS_FILENAME = "unchanged_labels.xlsx"
 
+# ZIP メンバーごとの圧縮方式（2026-07 追加）。xlsx はそれ自体が deflate 圧縮済みの
+# ZIP コンテナのため再圧縮しても縮まず CPU を使うだけなので無圧縮（STORED）で格納する。
+# 差分DXF（ASCII テキスト）は一定サイズ以上のみ最速レベルの deflate で圧縮し、
+# 小さいものは圧縮コストに見合わないため STORED とする。
+DXF_DEFLATE_MIN_SIZE = 64 * 1024
+DXF_DEFLATE_LEVEL = 1
+
+
+def _available_cpu_count():
+    """このプロセスが実行できる CPU 数を返す。
+
+    os.cpu_count() はホスト全体のコア数を返すため、CPU アフィニティで制限された
+    コンテナ等では多すぎる。取得できる環境では sched_getaffinity を使う。
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _write_dxf_member(zip_file, arcname, dxf_output):
+    """差分DXFを ZIP に格納する。
+
+    dxf_output は一時ファイルのパス（プロセスプールのワーカーが出力した場合）または
+    BytesIO（メインプロセスでメモリ上に出力した場合）。サイズが DXF_DEFLATE_MIN_SIZE
+    以上の場合のみ deflate で圧縮する。
+    """
+    if isinstance(dxf_output, BytesIO):
+        size = dxf_output.getbuffer().nbytes
+    else:
+        size = os.path.getsize(dxf_output)
+
+    compress_kwargs = {}
+    if size >= DXF_DEFLATE_MIN_SIZE:
+        compress_kwargs = {'compress_type': zipfile.ZIP_DEFLATED, 'compresslevel': DXF_DEFLATE_LEVEL}
+
+    if isinstance(dxf_output, BytesIO):
+        # getbuffer() はコピーせずにバッファを参照する。with で参照を解放しておかないと
+        # 後続の BytesIO.close() が BufferError になる
+        with dxf_output.getbuffer() as data:
+            zip_file.writestr(arcname, data, **compress_kwargs)
+    else:
+        zip_file.write(dxf_output, arcname=arcname, **compress_kwargs)
+
+
+def _compare_pair_dxf(source_file_path, main_file_path, output_file, compare_kwargs):
+    """1ペア分の差分DXFを output_file に生成する（ProcessPoolExecutor のワーカー用）。
+
+    ワーカープロセスへ pickle で渡せるようモジュールレベルに置く。PairFileCache は
+    プロセス間で共有できないため、ワーカー側ではキャッシュなしで読み込む。
+    """
+    return compare_dxf_files_and_generate_dxf(
+        source_file_path,      # 基準ファイルA (旧) → DELETED の判定基準
+        main_file_path,        # 比較対象ファイルB (新) → ADDED の判定基準
+        output_file,
+        offset_b=None,
+        **compare_kwargs,
+    )
+
+
+def _submit_pair_jobs(jobs, worker_count, compare_kwargs, label_kwargs):
+    """ペアごとのラベル比較と差分DXF生成をプロセスプールへ一括投入する。
+
+    Args:
+        jobs: (source_file_path, main_file_path, output_file) のリスト（ペア順）
+        worker_count: ワーカープロセス数
+        compare_kwargs: compare_dxf_files_and_generate_dxf に渡すキーワード引数
+        label_kwargs: compute_label_differences に渡すキーワード引数
+
+    Returns:
+        tuple: (executor, futures)。futures はペア順の (label_future, dxf_future) のリスト。
+        プールを使わない・使えない場合は (None, None)
+        （呼び出し元は逐次処理にフォールバックする）
+    """
+    if worker_count <= 1:
+        return None, None
+    executor = None
+    try:
+        # streamlit のスクリプト実行スレッドから fork すると子プロセスが親の状態
+        # （スレッド・ロック）を引き継いで不安定になるため spawn で起動する。
+        # set_start_method() はプロセス全体の設定を書き換えるので使わず、
+        # このプールにだけ spawn コンテキストを渡す。
+        executor = ProcessPoolExecutor(
+            max_workers=worker_count,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        # ラベル比較を先に投入し、ペア順に先頭から結果が揃うようにする
+        futures = [
+            (executor.submit(compute_label_differences, main, source, **label_kwargs),
+             executor.submit(_compare_pair_dxf, source, main, output, compare_kwargs))
+            for source, main, output in jobs
+        ]
+        return executor, futures
+    except (OSError, NotImplementedError, RuntimeError):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return None, None
+
 
 def create_diff_zip(pairs, master_df=None, master_filename=None, tolerance=None,
                     deleted_color=None, added_color=None, unchanged_color=None,
@@ -34,7 +135,8 @@ def create_diff_zip(pairs, master_df=None, master_filename=None, tolerance=None,
                     filter_non_parts=False, validate_ref_designators=False,
                     ignore_moved_labels=False, ignore_color_only_changes=False,
                     step1_mode=None, total_drawings_count=None,
-                    source_drawing_numbers=None, dest_drawing_numbers=None):
+                    source_drawing_numbers=None, dest_drawing_numbers=None,
+                    zip_output=None, max_workers=None):
     """
     ペアリストに基づいて差分DXFファイルを作成し、ZIPアーカイブを生成
 
@@ -61,9 +163,21 @@ def create_diff_zip(pairs, master_df=None, master_filename=None, tolerance=None,
         total_drawings_count: Summaryシートの図面統計の分母件数（呼び出し側で算出）
         source_drawing_numbers/dest_drawing_numbers: 完全新規図面判定
             （get_brand_new_drawing_pairs、mode='auto'時のみ使用）に渡す図番集合
+        zip_output: ZIPの書き出し先（ファイルパスまたはバイナリファイルオブジェクト）。
+            指定した場合は BytesIO に溜めずに直接書き出し、戻り値の zip_data は None
+            になる。差分DXFは一時ファイルから逐次書き込まれるため、ZIP全体をメモリに
+            保持しない分だけピークメモリが抑えられる（大量ペアのバッチ向け）
+        max_workers: ラベル比較・差分DXF生成の並列プロセス数（None の場合は
+            diff_config.MAX_DIFF_WORKERS とこのプロセスが使える CPU 数の小さい方。ペア数が
+            diff_config.MIN_PAIRS_FOR_DIFF_WORKERS 未満なら逐次処理）。ペアごとの
+            ラベル比較・DXF比較は互いに独立な CPU 処理のため、プロセスプールで並列に実行する。
+            結果・進捗通知・ZIP への格納順はペア順のまま（1 以下なら逐次処理）
 
     Returns:
         tuple: (zip_data, results, diff_labels_excel, unchanged_labels_excel, master_df)
+            zip_data は zip_output 未指定時のみ ZIP のバイトデータ（指定時は None）。
+            complete ペアが無く master_df も None の場合は何も生成せず、
+            zip_data は b""（zip_output 指定時は None）、各Excelは None になる
     """
     def report_error(message):
         if on_error:
@@ -88,283 +202,364 @@ def create_diff_zip(pairs, master_df=None, master_filename=None, tolerance=None,
     invalid_dict = defaultdict(lambda: {'count': 0, 'files': set()})
     pair_extracted_info = {}  # main_drawing → {title, subtitle} (DXF から抽出)
     label_cache = {}
-    zip_buffer = BytesIO()
     complete_pairs = [p for p in pairs if p['status'] == 'complete']
     total_pairs = len(complete_pairs)
 
+    # 差分抽出するペアも台帳も無ければ ZIP に入れるものが無いため、空のExcel・ZIPを
+    # 組み立てずに返す（2026-07 追加。zip_output 指定時は書き出し先に何も書かない）
+    if not complete_pairs and master_df is None:
+        return (None if zip_output is not None else b"", results, None, None, master_df)
+
+    zip_target = zip_output if zip_output is not None else BytesIO()
+
+    compare_kwargs = {
+        'tolerance': tolerance,
+        'deleted_color': deleted_color,
+        'added_color': added_color,
+        'unchanged_color': unchanged_color,
+        'ignore_color_only_changes': ignore_color_only_changes,
+    }
+    label_kwargs = {
+        'tolerance': tolerance,
+        'filter_non_parts': filter_non_parts,
+        'validate_ref_designators': validate_ref_designators,
+        'ignore_moved_labels': ignore_moved_labels,
+    }
+    if max_workers is None:
+        if total_pairs < diff_config.MIN_PAIRS_FOR_DIFF_WORKERS:
+            max_workers = 1
+        else:
+            max_workers = min(diff_config.MAX_DIFF_WORKERS, _available_cpu_count())
+    worker_count = min(max_workers, total_pairs)
+
+    # 並列処理する場合は一時出力ファイルをペアごとに先に用意し、ラベル比較と DXF比較を
+    # プロセスプールへ一括投入する（差分DXFはファイル経由で受け取る）。ラベル比較も
+    # ワーカーで行う（2026-07 変更）ため、下のループは結果の集計と ZIP への格納だけになる。
+    # ワーカー間ではラベルのキャッシュ（label_cache）を共有できないが、ペアごとの
+    # 抽出処理を並列化する効果の方が大きい。逐次処理の場合は
+    # 一時ファイルを使わずメモリ上（BytesIO）に出力して ZIP へ直接書き込む（2026-07 変更）。
+    # 一時出力はバッチ専用のディレクトリにまとめ、最後にディレクトリごと削除する（孤立した
+    # 場合も cleanup_stale_temp_files の掃除対象になるよう本アプリの prefix を付ける）。
+    # ファイルを事前作成する必要はないため、パスを決めるだけでよい（ワーカーが作成する）。
+    temp_output_dir = None
+    temp_outputs = []
+    executor, pair_futures = None, None
+    if worker_count > 1:
+        temp_output_dir = tempfile.mkdtemp(prefix=TEMP_FILE_PREFIX)
+        temp_outputs = [os.path.join(temp_output_dir, f"{i}.dxf") for i in range(total_pairs)]
+        executor, pair_futures = _submit_pair_jobs(
+            [(p['source_file_info']['temp_path'], p['main_file_info']['temp_path'], out)
+             for p, out in zip(complete_pairs, temp_outputs)],
+            worker_count,
+            compare_kwargs,
+            label_kwargs,
+        )
+
     # 同じファイルが複数ペアの基準/比較対象として再利用される場合（RevUp/流用
     # チェーンで同じ親図面が複数の子の流用元になる等）の再解析を避けるキャッシュ。
     # offset_b は常に None（このバッチ全体で固定値）なのでキーに含めて一致させる。
-    pair_cache_keys = (
-        [(p['main_file_info']['temp_path'], None) for p in complete_pairs] +
-        [(p['source_file_info']['temp_path'], None) for p in complete_pairs]
-    )
-    pair_cache = PairFileCache(pair_cache_keys)
-
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-
-        for index, pair in enumerate(complete_pairs, start=1):
-            main_drawing = pair['main_drawing']
-            source_drawing = pair['source_drawing']
-            main_file_path = pair['main_file_info']['temp_path']
-            source_file_path = pair['source_file_info']['temp_path']
-
-            # 出力ファイル名を生成
-            output_filename = f"{main_drawing}_vs_{source_drawing}.dxf"
-
-            # 一時出力ファイルを作成
-            temp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".dxf").name
-
-            change_rows = []
-            filtered_unchanged = []
-            change_label_count = 0
-            unchanged_label_count = 0
-
-            extra_info = {'labels_new': [], 'invalid_ref_designators': []}
-            try:
-                change_rows, unchanged_entries, extra_info = compute_label_differences(
-                    main_file_path,
-                    source_file_path,
-                    tolerance=tolerance,
-                    label_cache=label_cache,
-                    filter_non_parts=filter_non_parts,
-                    validate_ref_designators=validate_ref_designators,
-                    ignore_moved_labels=ignore_moved_labels,
-                )
-                filtered_unchanged = filter_unchanged_by_prefix(unchanged_entries, prefixes)
-                change_label_count = len(change_rows)
-                unchanged_label_count = sum(row.get('Count', 0) for row in filtered_unchanged)
-            except Exception as e:
-                report_error(f"ラベル比較中にエラーが発生しました ({main_drawing}): {str(e)}")
+    # プロセスプール使用時はワーカー間で共有できないため逐次処理の場合のみ使う。
+    pair_cache = None
+    if pair_futures is None:
+        pair_cache_keys = (
+            [(p['main_file_info']['temp_path'], None) for p in complete_pairs] +
+            [(p['source_file_info']['temp_path'], None) for p in complete_pairs]
+        )
+        pair_cache = PairFileCache(pair_cache_keys)
+
+    try:
+        with zipfile.ZipFile(zip_target, 'w', zipfile.ZIP_STORED) as zip_file:
+
+            for index, pair in enumerate(complete_pairs, start=1):
+                main_drawing = pair['main_drawing']
+                source_drawing = pair['source_drawing']
+                main_file_path = pair['main_file_info']['temp_path']
+                source_file_path = pair['source_file_info']['temp_path']
+
+                # 出力ファイル名を生成
+                output_filename = f"{main_drawing}_vs_{source_drawing}.dxf"
+
+                if pair_futures is not None:
+                    label_future, dxf_future = pair_futures[index - 1]
+                    dxf_output = temp_outputs[index - 1]
+                else:
+                    label_future, dxf_future = None, None
+                    dxf_output = BytesIO()
+
                 change_rows = []
                 filtered_unchanged = []
+                change_label_count = 0
+                unchanged_label_count = 0
 
-            # Summary 行を収集
-            added_count = sum(1 for r in change_rows if r['Old Label'] is None)
-            deleted_count = sum(1 for r in change_rows if r['New Label'] is None)
-            changed_count = sum(1 for r in change_rows if r['Old Label'] is not None and r['New Label'] is not None)
-            resolved_title = extra_info.get('title') or pair.get('title')
-            resolved_subtitle = extra_info.get('subtitle') or pair.get('subtitle')
-            pair_extracted_info[main_drawing] = {'title': resolved_title, 'subtitle': resolved_subtitle}
-            summary_data.append({
-                '図番': main_drawing,
-                '流用元図番': source_drawing,
-                '追加ラベル数': added_count,
-                '削除ラベル数': deleted_count,
-                '変更ラベル数': changed_count,
-                'タイトル': resolved_title,
-                'サブタイトル': resolved_subtitle,
-            })
-
-            # Total 用ラベル集計
-            if filter_non_parts:
-                for label, _x, _y in extra_info['labels_new']:
-                    total_counter[label] += 1
-
-            # Invalid 集計
-            if validate_ref_designators:
-                for sym in extra_info['invalid_ref_designators']:
-                    invalid_dict[sym]['count'] += 1
-                    invalid_dict[sym]['files'].add(main_drawing)
-
-            diff_label_sheets.append({
-                'sheet_name': main_drawing,
-                'rows': change_rows,
-                'old_label_name': f"Old: {source_drawing}",
-                'new_label_name': f"New: {main_drawing}"
-            })
-            unchanged_label_sheets.append({'sheet_name': main_drawing, 'rows': filtered_unchanged})
-
-            try:
-                if progress_callback:
-                    progress_callback(index - 1, total_pairs, f"{main_drawing} vs {source_drawing} 処理中")
-
-                # DXF比較処理。compare_dxf_files_and_generate_dxf() は file_a のみに
-                # 存在するエンティティを DELETED、file_b のみに存在するエンティティを
-                # ADDED として出力する（標準的な diff の慣習: file_a=旧基準、file_b=新
-                # 比較対象）。そのため流用元図番（旧）を file_a、図番（新）を file_b に
-                # 渡す（2026-07 修正: 以前は新旧が逆で ADDED/DELETED レイヤーの内容が
-                # 入れ替わっていた不具合があった）。
-                success, entity_counts = compare_dxf_files_and_generate_dxf(
-                    source_file_path,      # 基準ファイルA (旧) → DELETED の判定基準
-                    main_file_path,        # 比較対象ファイルB (新) → ADDED の判定基準
-                    temp_output,
-                    tolerance=tolerance,
-                    deleted_color=deleted_color,
-                    added_color=added_color,
-                    unchanged_color=unchanged_color,
-                    offset_b=None,
-                    pair_cache=pair_cache,
-                    ignore_color_only_changes=ignore_color_only_changes,
-                )
+                extra_info = {'labels_new': [], 'invalid_ref_designators': []}
+                try:
+                    if label_future is not None:
+                        change_rows, unchanged_entries, extra_info = label_future.result()
+                    else:
+                        change_rows, unchanged_entries, extra_info = compute_label_differences(
+                            main_file_path,
+                            source_file_path,
+                            label_cache=label_cache,
+                            **label_kwargs,
+                        )
+                    filtered_unchanged = filter_unchanged_by_prefix(unchanged_entries, prefixes)
+                    change_label_count = len(change_rows)
+                    unchanged_label_count = sum(row.get('Count', 0) for row in filtered_unchanged)
+                except Exception as e:
+                    report_error(f"ラベル比較中にエラーが発生しました ({main_drawing}): {str(e)}")
+                    change_rows = []
+                    filtered_unchanged = []
+
+                # Summary 行を収集
+                added_count = sum(1 for r in change_rows if r['Old Label'] is None)
+                deleted_count = sum(1 for r in change_rows if r['New Label'] is None)
+                changed_count = sum(1 for r in change_rows if r['Old Label'] is not None and r['New Label'] is not None)
+                resolved_title = extra_info.get('title') or pair.get('title')
+                resolved_subtitle = extra_info.get('subtitle') or pair.get('subtitle')
+                pair_extracted_info[main_drawing] = {'title': resolved_title, 'subtitle': resolved_subtitle}
+                summary_data.append({
+                    '図番': main_drawing,
+                    '流用元図番': source_drawing,
+                    '追加ラベル数': added_count,
+                    '削除ラベル数': deleted_count,
+                    '変更ラベル数': changed_count,
+                    'タイトル': resolved_title,
+                    'サブタイトル': resolved_subtitle,
+                })
 
-                if success:
-                    zip_file.write(temp_output, arcname=output_filename)
-                    results.append({
-                        'pair_name': f"{main_drawing} vs {source_drawing}",
-                        'main_drawing': main_drawing,
-                        'source_drawing': source_drawing,
-                        'output_filename': output_filename,
-                        'success': True,
-                        'entity_counts': entity_counts,
-                        'relation': pair.get('relation', 'なし'),
-                        'change_label_count': change_label_count,
-                        'unchanged_label_count': unchanged_label_count
-                    })
-                else:
+                # Total 用ラベル集計
+                if filter_non_parts:
+                    for label, _x, _y in extra_info['labels_new']:
+                        total_counter[label] += 1
+
+                # Invalid 集計
+                if validate_ref_designators:
+                    for sym in extra_info['invalid_ref_designators']:
+                        invalid_dict[sym]['count'] += 1
+                        invalid_dict[sym]['files'].add(main_drawing)
+
+                diff_label_sheets.append({
+                    'sheet_name': main_drawing,
+                    'rows': change_rows,
+                    'old_label_name': f"Old: {source_drawing}",
+                    'new_label_name': f"New: {main_drawing}"
+                })
+                unchanged_label_sheets.append({'sheet_name': main_drawing, 'rows': filtered_unchanged})
+
+                try:
+                    if progress_callback:
+                        progress_callback(index - 1, total_pairs, f"{main_drawing} vs {source_drawing} 処理中")
+
+                    # DXF比較処理。compare_dxf_files_and_generate_dxf() は file_a のみに
+                    # 存在するエンティティを DELETED、file_b のみに存在するエンティティを
+                    # ADDED として出力する（標準的な diff の慣習: file_a=旧基準、file_b=新
+                    # 比較対象）。そのため流用元図番（旧）を file_a、図番（新）を file_b に
+                    # 渡す（2026-07 修正: 以前は新旧が逆で ADDED/DELETED レイヤーの内容が
+                    # 入れ替わっていた不具合があった）。
+                    if dxf_future is not None:
+                        success, entity_counts = dxf_future.result()
+                    else:
+                        success, entity_counts = compare_dxf_files_and_generate_dxf(
+                            source_file_path,      # 基準ファイルA (旧) → DELETED の判定基準
+                            main_file_path,        # 比較対象ファイルB (新) → ADDED の判定基準
+                            dxf_output,
+                            offset_b=None,
+                            pair_cache=pair_cache,
+                            **compare_kwargs,
+                        )
+
+                    if success:
+                        _write_dxf_member(zip_file, output_filename, dxf_output)
+                        results.append({
+                            'pair_name': f"{main_drawing} vs {source_drawing}",
+                            'main_drawing': main_drawing,
+                            'source_drawing': source_drawing,
+                            'output_filename': output_filename,
+                            'success': True,
+                            'entity_counts': entity_counts,
+                            'relation': pair.get('relation', 'なし'),
+                            'change_label_count': change_label_count,
+                            'unchanged_label_count': unchanged_label_count
+                        })
+                    else:
+                        results.append({
+                            'pair_name': f"{main_drawing} vs {source_drawing}",
+                            'main_drawing': main_drawing,
+                            'source_drawing': source_drawing,
+                            'output_filename': output_filename,
+                            'success': False,
+                            'entity_counts': None,
+                            'relation': pair.get('relation', 'なし'),
+                            'change_label_count': change_label_count,
+                            'unchanged_label_count': unchanged_label_count
+                        })
+
+                except Exception as e:
+                    report_error(f"ペア {main_drawing} vs {source_drawing} の図面作成中にエラーが発生しました: {str(e)}")
                     results.append({
                         'pair_name': f"{main_drawing} vs {source_drawing}",
                         'main_drawing': main_drawing,
                         'source_drawing': source_drawing,
                         'output_filename': output_filename,
                         'success': False,
-                        'entity_counts': None,
+                        'error': str(e),
                         'relation': pair.get('relation', 'なし'),
+                        'entity_counts': None,
                         'change_label_count': change_label_count,
                         'unchanged_label_count': unchanged_label_count
                     })
+                finally:
+                    # ZIP に格納済み（または失敗）の出力はすぐに解放する
+                    if isinstance(dxf_output, BytesIO):
+                        dxf_output.close()
+                    else:
+                        try:
+                            os.unlink(dxf_output)
+                        except Exception:
+                            pass
 
-            except Exception as e:
-                report_error(f"ペア {main_drawing} vs {source_drawing} の図面作成中にエラーが発生しました: {str(e)}")
-                results.append({
-                    'pair_name': f"{main_drawing} vs {source_drawing}",
-                    'main_drawing': main_drawing,
-                    'source_drawing': source_drawing,
-                    'output_filename': output_filename,
-                    'success': False,
-                    'error': str(e),
-                    'relation': pair.get('relation', 'なし'),
-                    'entity_counts': None,
-                    'change_label_count': change_label_count,
-                    'unchanged_label_count': unchanged_label_count
-                })
-            finally:
-                try:
-                    os.unlink(temp_output)
-                except Exception:
-                    pass
-
-            if progress_callback:
-                progress_callback(index, total_pairs, f"{main_drawing} vs {source_drawing} 処理完了")
-
-        # 図面管理台帳を結果で更新（エンティティ数を含む）
-        if master_df is not None:
-            pairs_with_entity_counts = []
-            for result in results:
-                if result['success']:
-                    original_pair = next((p for p in complete_pairs
-                                         if p['main_drawing'] == result['main_drawing']
-                                         and p['source_drawing'] == result['source_drawing']), None)
-
-                    if original_pair:
-                        pair_with_counts = original_pair.copy()
-                        pair_with_counts['entity_counts'] = result['entity_counts']
-                        extracted = pair_extracted_info.get(result['main_drawing'], {})
-                        if extracted.get('title'):
-                            pair_with_counts['title'] = extracted['title']
-                        if extracted.get('subtitle'):
-                            pair_with_counts['subtitle'] = extracted['subtitle']
-                        pairs_with_entity_counts.append(pair_with_counts)
-
-            if pairs_with_entity_counts:
-                master_df, _ = update_parent_child_master(master_df, pairs_with_entity_counts)
-
-            # 完全新規図面（流用元の参照がない図面）のエンティティ数を算出して台帳に反映。
-            # diff抽出（上記の complete_pairs ループ）の対象外のため、ここで単独ファイルの
-            # エンティティ数を数えて Added=Total として登録する（2026-06 追加）。
-            brand_new_pairs = get_brand_new_drawing_pairs(
-                pairs, step1_mode,
-                source_drawing_numbers=source_drawing_numbers,
-                dest_drawing_numbers=dest_drawing_numbers,
-            ) if step1_mode else []
-            brand_new_with_counts = []
-            for pair in brand_new_pairs:
-                file_info = pair.get('main_file_info')
-                if not file_info or not file_info.get('temp_path'):
-                    continue  # ファイル未アップロードのため算出不可
-                count = count_entities_in_dxf_file(
-                    file_info['temp_path'], tolerance=tolerance,
-                    ignore_color_only_changes=ignore_color_only_changes)
-                if count is None:
-                    continue
-                pair_with_counts = dict(pair, relation='完全新規図面')
-                pair_with_counts['entity_counts'] = {'added_entities': count, 'total_entities': count}
-                # 方式C（pair_list）はファイル名のみで図番を識別し DXF 解析を行わない
-                # （_extract_by_filename）ため、main_file_info に title/subtitle が
-                # 入っていない。complete ペアは差分抽出時に extra_info から取得する
-                # 一方、完全新規図面は差分抽出を行わないため、ここで個別に抽出する
-                # （2026-06 追加）。方式A/Bは元々 title/subtitle 取得済みのためスキップ。
-                if not pair_with_counts.get('title'):
-                    try:
-                        _, title_info = extract_labels(
-                            file_info['temp_path'],
-                            filter_non_parts=False,
-                            sort_order="none",
-                            debug=False,
-                            selected_layers=None,
-                            validate_ref_designators=False,
-                            extract_drawing_numbers_option=False,
-                            extract_title_option=True,
-                            original_filename=file_info.get('filename'),
-                        )
-                        pair_with_counts['title'] = title_info.get('title')
-                        pair_with_counts['subtitle'] = title_info.get('subtitle')
-                    except Exception:
-                        pass
-                brand_new_with_counts.append(pair_with_counts)
-
-            if brand_new_with_counts:
-                master_df, _ = update_parent_child_master(master_df, brand_new_with_counts)
-
-        # Total データ生成
-        total_data = None
-        if filter_non_parts and total_counter:
-            total_data = [{'ラベル': lbl, '個数': cnt} for lbl, cnt in sorted(total_counter.items())]
-
-        # Invalid データ生成
-        invalid_data = None
-        if validate_ref_designators and invalid_dict:
-            invalid_data = [
-                {'機器符号': sym, '個数': v['count'], 'ファイル名': ', '.join(sorted(v['files']))}
-                for sym, v in sorted(invalid_dict.items())
-            ]
-
-        # Summary シートの「図番」欄・ペアシートの並び順を図番のABC順にする。
-        # summary_data と diff_label_sheets は上のループで1ペアにつき1件ずつ同じ順序で
-        # 追加されているため（同一図番が複数ペアに登場する場合は元の順序を保つ = 安定ソート）、
-        # インデックスベースで両方を同じ並びに揃える。
-        if summary_data:
-            sort_order = sorted(range(len(summary_data)), key=lambda i: summary_data[i].get('図番') or '')
-            summary_data = [summary_data[i] for i in sort_order]
-            diff_label_sheets = [diff_label_sheets[i] for i in sort_order]
-
-        diff_labels_excel = build_diff_labels_workbook(
-            diff_label_sheets,
-            summary_data=summary_data if summary_data else None,
-            total_data=total_data,
-            invalid_data=invalid_data,
-        )
-
-        # unchanged_labels.xlsx のシート順も diff_labels.xlsx と同じく図番のABC順に揃える
-        # （2026-07 追加。diff_labels 側だけソートすると同一バッチの2ファイル間で
-        # シート順が食い違い、突き合わせて確認する際に混乱するため）。
-        unchanged_label_sheets = sorted(unchanged_label_sheets, key=lambda s: s.get('sheet_name') or '')
-        unchanged_labels_excel = build_unchanged_labels_workbook(unchanged_label_sheets)
-
-        if diff_labels_excel:
-            zip_file.writestr(DIFF_LABELS_FILENAME, diff_labels_excel)
-        if unchanged_labels_excel:
-            zip_file.writestr(UNCHANGED_LABELS_FILENAME, unchanged_labels_excel)
-
-        if master_df is not None:
-            master_excel_data = save_master_to_bytes(
-                master_df, pairs=pairs, mode=step1_mode, total_drawings_count=total_drawings_count
-            )
-            output_master_filename = master_filename if master_filename else diff_config.MASTER_FILENAME
-            zip_file.writestr(output_master_filename, master_excel_data)
-
-    zip_buffer.seek(0)
-    zip_data = zip_buffer.getvalue()
+                if progress_callback:
+                    progress_callback(index, total_pairs, f"{main_drawing} vs {source_drawing} 処理完了")
+
+            # 図面管理台帳を結果で更新（エンティティ数を含む）
+            if master_df is not None:
+                pairs_with_entity_counts = []
+                # (図番, 流用元図番) → 元のペア。結果ごとの線形探索（ペア数²）を避ける
+                # （2026-07 追加）。同じキーが複数ある場合は従来どおり最初のペアを使う。
+                pair_by_key = {}
+                for p in complete_pairs:
+                    pair_by_key.setdefault((p['main_drawing'], p['source_drawing']), p)
+                for result in results:
+                    if result['success']:
+                        original_pair = pair_by_key.get((result['main_drawing'], result['source_drawing']))
+
+                        if original_pair:
+                            pair_with_counts = original_pair.copy()
+                            pair_with_counts['entity_counts'] = result['entity_counts']
+                            extracted = pair_extracted_info.get(result['main_drawing'], {})
+                            if extracted.get('title'):
+                                pair_with_counts['title'] = extracted['title']
+                            if extracted.get('subtitle'):
+                                pair_with_counts['subtitle'] = extracted['subtitle']
+                            pairs_with_entity_counts.append(pair_with_counts)
+
+                # 完全新規図面（流用元の参照がない図面）のエンティティ数を算出して台帳に反映。
+                # diff抽出（上記の complete_pairs ループ）の対象外のため、ここで単独ファイルの
+                # エンティティ数を数えて Added=Total として登録する（2026-06 追加）。
+                brand_new_pairs = get_brand_new_drawing_pairs(
+                    pairs, step1_mode,
+                    source_drawing_numbers=source_drawing_numbers,
+                    dest_drawing_numbers=dest_drawing_numbers,
+                ) if step1_mode else []
+                brand_new_with_counts = []
+                for pair in brand_new_pairs:
+                    file_info = pair.get('main_file_info')
+                    if not file_info or not file_info.get('temp_path'):
+                        continue  # ファイル未アップロードのため算出不可
+                    count = count_entities_in_dxf_file(
+                        file_info['temp_path'], tolerance=tolerance,
+                        ignore_color_only_changes=ignore_color_only_changes)
+                    if count is None:
+                        continue
+                    pair_with_counts = dict(pair, relation='完全新規図面')
+                    pair_with_counts['entity_counts'] = {'added_entities': count, 'total_entities': count}
+                    # 方式C（pair_list）はファイル名のみで図番を識別し DXF 解析を行わない
+                    # （_extract_by_filename）ため、main_file_info に title/subtitle が
+                    # 入っていない。complete ペアは差分抽出時に extra_info から取得する
+                    # 一方、完全新規図面は差分抽出を行わないため、ここで個別に抽出する
+                    # （2026-06 追加）。方式A/Bは元々 title/subtitle 取得済みのためスキップ。
+                    if not pair_with_counts.get('title'):
+                        try:
+                            _, title_info = extract_labels(
+                                file_info['temp_path'],
+                                filter_non_parts=False,
+                                sort_order="none",
+                                debug=False,
+                                selected_layers=None,
+                                validate_ref_designators=False,
+                                extract_drawing_numbers_option=False,
+                                extract_title_option=True,
+                                original_filename=file_info.get('filename'),
+                            )
+                            pair_with_counts['title'] = title_info.get('title')
+                            pair_with_counts['subtitle'] = title_info.get('subtitle')
+                        except Exception:
+                            pass
+                    brand_new_with_counts.append(pair_with_counts)
+
+                # 差分抽出ペアと完全新規図面を1回の呼び出しでまとめて反映する（2026-07 変更）。
+                # 呼び出しごとに台帳全体のコピーと新規行の結合が発生するため、以前のように
+                # 2回に分けて呼ぶと台帳が大きいほど無駄が増える。両者の (Parent, Child) は
+                # 重ならない（完全新規図面は Parent="none"）ため、反映結果・行順は変わらない。
+                ledger_pairs = pairs_with_entity_counts + brand_new_with_counts
+                if ledger_pairs:
+                    master_df, _ = update_parent_child_master(master_df, ledger_pairs)
+
+            # Total データ生成
+            total_data = None
+            if filter_non_parts and total_counter:
+                total_data = [{'ラベル': lbl, '個数': cnt} for lbl, cnt in sorted(total_counter.items())]
+
+            # Invalid データ生成
+            invalid_data = None
+            if validate_ref_designators and invalid_dict:
+                invalid_data = [
+                    {'機器符号': sym, '個数': v['count'], 'ファイル名': ', '.join(sorted(v['files']))}
+                    for sym, v in sorted(invalid_dict.items())
+                ]
+
+            # Summary シートの「図番」欄・ペアシートの並び順を図番のABC順にする。
+            # summary_data と diff_label_sheets は上のループで1ペアにつき1件ずつ同じ順序で
+            # 追加されているため（同一図番が複数ペアに登場する場合は元の順序を保つ = 安定ソート）、
+            # インデックスベースで両方を同じ並びに揃える。
+            if summary_data:
+                sort_order = sorted(range(len(summary_data)), key=lambda i: summary_data[i].get('図番') or '')
+                summary_data = [summary_data[i] for i in sort_order]
+                diff_label_sheets = [diff_label_sheets[i] for i in sort_order]
+
+            # unchanged_labels.xlsx のシート順も diff_labels.xlsx と同じく図番のABC順に揃える
+            # （2026-07 追加。diff_labels 側だけソートすると同一バッチの2ファイル間で
+            # シート順が食い違い、突き合わせて確認する際に混乱するため）。
+            unchanged_label_sheets = sorted(unchanged_label_sheets, key=lambda s: s.get('sheet_name') or '')
+
+            # 2つのラベルExcelは互いに独立しているため、スレッドで並行して組み立てる
+            # （2026-07 追加。xlsx 内部の zlib 圧縮は GIL を解放するため重なる分だけ短縮できる）
+            with ThreadPoolExecutor(max_workers=2) as workbook_executor:
+                diff_labels_future = workbook_executor.submit(
+                    build_diff_labels_workbook,
+                    diff_label_sheets,
+                    summary_data=summary_data if summary_data else None,
+                    total_data=total_data,
+                    invalid_data=invalid_data,
+                )
+                unchanged_labels_future = workbook_executor.submit(
+                    build_unchanged_labels_workbook, unchanged_label_sheets)
+                diff_labels_excel = diff_labels_future.result()
+                unchanged_labels_excel = unchanged_labels_future.result()
+
+            if diff_labels_excel:
+                zip_file.writestr(DIFF_LABELS_FILENAME, diff_labels_excel)
+            if unchanged_labels_excel:
+                zip_file.writestr(UNCHANGED_LABELS_FILENAME, unchanged_labels_excel)
+
+            if master_df is not None:
+                # 台帳Excelは ZIP メンバーへ直接書き出し、全体の bytes を中間に持たない
+                # （2026-07 変更）。2つのラベルExcelは戻り値として個別ダウンロードにも
+                # 使うため、従来どおり bytes で組み立てて格納する。
+                output_master_filename = master_filename if master_filename else diff_config.MASTER_FILENAME
+                with zip_file.open(output_master_filename, 'w', force_zip64=True) as master_member:
+                    write_master_excel(
+                        master_member, master_df, pairs=pairs, mode=step1_mode,
+                        total_drawings_count=total_drawings_count
+                    )
+    finally:
+        # 途中で例外が発生した場合もワーカープロセスと未処理の一時出力ファイルを残さない
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if temp_output_dir is not None:
+            shutil.rmtree(temp_output_dir, ignore_errors=True)
+
+    zip_data = zip_target.getvalue() if zip_output is None else None
 
     # メモリ解放: 大きなデータ構造を削除
     del diff_label_sheets
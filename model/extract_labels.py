@@ -538,6 +538,92 @@ def determine_drawing_number_types(
     return {'main_drawing': main_drawing, 'source_drawing': source_drawing, 'main_group': main_group}
 
 
+def _collect_text_entities(doc, layer_names):
+    """TEXT/MTEXT エンティティを (entity, group_key) のリストとして収集する。
+
+    modelspace・paperspace の直接配置分と、layer_names に含まれるレイヤー上の
+    INSERT を virtual_entities() で展開した分を集め、同一種・同一レイヤー・
+    同一座標の重複を除く。extract_labels() と extract_drawing_numbers_only() で
+    共通に使う（2026-07 に extract_labels() から切り出し）。
+    """
+    # エンティティ収集
+    # 各要素は (entity, group_key)。group_key は所属タイトルブロック（INSERT）の
+    # 識別子。INSERT 由来は親 INSERT の handle、直接配置は自身の handle を使う。
+    # 旧・現行のタイトルブロックが同一座標に重なっているケースで、図番と流用元
+    # 図番が同じブロックに属することを判定するために用いる。
+    all_entities_to_process = []
+
+    def _entity_handle(entity):
+        return getattr(entity.dxf, 'handle', None)
+
+    # MODEL_SPACE
+    for e in doc.modelspace():
+        if e.dxftype() in ['TEXT', 'MTEXT']:
+            all_entities_to_process.append((e, _entity_handle(e)))
+
+    # PAPER_SPACE（Model 以外のレイアウト）
+    try:
+        for layout in doc.layouts:
+            if layout.name != 'Model':
+                for e in layout:
+                    if e.dxftype() in ['TEXT', 'MTEXT']:
+                        all_entities_to_process.append((e, _entity_handle(e)))
+    except Exception:
+        pass
+
+    # INSERT エンティティを virtual_entities() で展開（座標変換を含む）
+    # 展開後の仮想エンティティには親 INSERT の handle をグループキーとして付与する。
+    # テキストを含まないブロック（手描き回路図のコネクタ等の記号で多い）は
+    # virtual_entities() を呼ぶ前にスキップし、無駄な展開コストを避ける。
+    block_text_cache = {}
+    try:
+        for e in doc.modelspace():
+            if e.dxftype() == 'INSERT' and e.dxf.layer in layer_names:
+                if not _block_has_text_content(doc, e.dxf.name, block_text_cache):
+                    continue
+                insert_group = _entity_handle(e)
+                try:
+                    for virtual_entity in e.virtual_entities():
+                        if virtual_entity.dxftype() in ['TEXT', 'MTEXT']:
+                            all_entities_to_process.append((virtual_entity, insert_group))
+                except Exception:
+                    pass
+
+        for layout in doc.layouts:
+            if layout.name != 'Model':
+                for e in layout:
+                    if e.dxftype() == 'INSERT' and e.dxf.layer in layer_names:
+                        if not _block_has_text_content(doc, e.dxf.name, block_text_cache):
+                            continue
+                        insert_group = _entity_handle(e)
+                        try:
+                            for virtual_entity in e.virtual_entities():
+                                if virtual_entity.dxftype() in ['TEXT', 'MTEXT']:
+                                    all_entities_to_process.append((virtual_entity, insert_group))
+                        except Exception:
+                            pass
+    except Exception:
+        pass
+
+    # 重複除去（同一種・同一レイヤー・同一座標）
+    seen_entities = set()
+    unique_entities = []
+    for e, group_key in all_entities_to_process:
+        try:
+            entity_key = (
+                e.dxftype(),
+                e.dxf.layer if hasattr(e.dxf, 'layer') else '',
+                getattr(e.dxf, 'insert', (0, 0)) if hasattr(e.dxf, 'insert') else (0, 0),
+            )
+            if entity_key not in seen_entities:
+                seen_entities.add(entity_key)
+                unique_entities.append((e, group_key))
+        except Exception:
+            unique_entities.append((e, group_key))
+
+    return unique_entities
+
+
 def extract_labels(dxf_file, filter_non_parts=False, sort_order="asc", debug=False,
                    selected_layers=None, validate_ref_designators=False,
                    extract_drawing_numbers_option=False, extract_title_option=False,
@@ -574,87 +660,12 @@ def extract_labels(dxf_file, filter_non_parts=False, sort_order="asc", debug=Fal
         drawing_number_candidates = []
         all_labels_with_coords = []
 
-        # エンティティ収集
-        # 各要素は (entity, group_key)。group_key は所属タイトルブロック（INSERT）の
-        # 識別子。INSERT 由来は親 INSERT の handle、直接配置は自身の handle を使う。
-        # 旧・現行のタイトルブロックが同一座標に重なっているケースで、図番と流用元
-        # 図番が同じブロックに属することを判定するために用いる。
-        all_entities_to_process = []
-
-        def _entity_handle(entity):
-            return getattr(entity.dxf, 'handle', None)
-
-        # MODEL_SPACE
-        for e in msp:
-            if e.dxftype() in ['TEXT', 'MTEXT']:
-                all_entities_to_process.append((e, _entity_handle(e)))
-
-        # PAPER_SPACE（Model 以外のレイアウト）
-        try:
-            for layout in doc.layouts:
-                if layout.name != 'Model':
-                    for e in layout:
-                        if e.dxftype() in ['TEXT', 'MTEXT']:
-                            all_entities_to_process.append((e, _entity_handle(e)))
-        except Exception:
-            pass
-
-        # INSERT エンティティを virtual_entities() で展開（座標変換を含む）
-        # 展開後の仮想エンティティには親 INSERT の handle をグループキーとして付与する。
-        # テキストを含まないブロック（手描き回路図のコネクタ等の記号で多い）は
-        # virtual_entities() を呼ぶ前にスキップし、無駄な展開コストを避ける。
-        block_text_cache = {}
-        try:
-            for e in msp:
-                if e.dxftype() == 'INSERT' and e.dxf.layer in selected_layers:
-                    if not _block_has_text_content(doc, e.dxf.name, block_text_cache):
-                        continue
-                    insert_group = _entity_handle(e)
-                    try:
-                        for virtual_entity in e.virtual_entities():
-                            if virtual_entity.dxftype() in ['TEXT', 'MTEXT']:
-                                all_entities_to_process.append((virtual_entity, insert_group))
-                    except Exception:
-                        pass
-
-            for layout in doc.layouts:
-                if layout.name != 'Model':
-                    for e in layout:
-                        if e.dxftype() == 'INSERT' and e.dxf.layer in selected_layers:
-                            if not _block_has_text_content(doc, e.dxf.name, block_text_cache):
-                                continue
-                            insert_group = _entity_handle(e)
-                            try:
-                                for virtual_entity in e.virtual_entities():
-                                    if virtual_entity.dxftype() in ['TEXT', 'MTEXT']:
-                                        all_entities_to_process.append((virtual_entity, insert_group))
-                            except Exception:
-                                pass
-        except Exception:
-            pass
-
-        # 重複除去（同一種・同一レイヤー・同一座標）
-        seen_entities = set()
-        unique_entities = []
-        for e, group_key in all_entities_to_process:
-            try:
-                entity_key = (
-                    e.dxftype(),
-                    e.dxf.layer if hasattr(e.dxf, 'layer') else '',
-                    getattr(e.dxf, 'insert', (0, 0)) if hasattr(e.dxf, 'insert') else (0, 0),
-                )
-                if entity_key not in seen_entities:
-                    seen_entities.add(entity_key)
-                    unique_entities.append((e, group_key))
-            except Exception:
-                unique_entities.append((e, group_key))
-
-        del all_entities_to_process
-        del seen_entities
+        layer_names = set(selected_layers)
+        unique_entities = _collect_text_entities(doc, layer_names)
 
         # テキスト抽出
         for e, group_key in unique_entities:
-            if e.dxf.layer in selected_layers:
+            if e.dxf.layer in layer_names:
                 raw_text, clean_text, coordinates = extract_text_from_entity(e)
 
                 if clean_text:
@@ -738,6 +749,60 @@ def extract_labels(dxf_file, filter_non_parts=False, sort_order="asc", debug=Fal
         return [], info
 
 
+def extract_drawing_numbers_only(dxf_file, original_filename=None):
+    """DXFファイルから図番・流用元図番のみを抽出する（extract_labels の軽量版）。
+
+    extract_labels(extract_drawing_numbers_option=True, selected_layers=None) と同じ
+    判定結果を返すが、ラベル一覧の構築・機器符号フィルタ/妥当性チェック・ソート・
+    タイトル抽出を行わない。アップロード時に流用元図番だけが必要な場合に使う
+    （2026-07 追加）。図番の判別（determine_drawing_number_types）は「流用元図番」
+    等のラベルとの位置関係を使うため、テキストの収集自体は省略できない。
+
+    Args:
+        dxf_file: DXFファイルパス
+        original_filename: 図番照合に使う元のファイル名（一時ファイル名で保存されている場合）
+
+    Returns:
+        dict: main_drawing_number / source_drawing_number / all_drawing_numbers
+
+    Raises:
+        読み込み・解析に失敗した場合は ezdxf 等の例外をそのまま送出する
+        （呼び出し元がファイルごとのエラーとして表示する）
+    """
+    info = {
+        "main_drawing_number": None,
+        "source_drawing_number": None,
+        "all_drawing_numbers": [],
+    }
+
+    doc = ezdxf.readfile(dxf_file)
+    layer_names = {layer.dxf.name for layer in doc.layers}
+
+    drawing_number_candidates = []
+    all_labels_with_coords = []
+    for e, group_key in _collect_text_entities(doc, layer_names):
+        if e.dxf.layer in layer_names:
+            _, clean_text, coordinates = extract_text_from_entity(e)
+            if clean_text:
+                all_labels_with_coords.append((clean_text, coordinates, group_key))
+                for dn in extract_drawing_numbers(clean_text):
+                    drawing_number_candidates.append((dn, coordinates, group_key))
+
+    if drawing_number_candidates:
+        drawing_info = determine_drawing_number_types(
+            drawing_number_candidates,
+            all_labels=all_labels_with_coords,
+            filename=original_filename if original_filename else dxf_file,
+        )
+        info["main_drawing_number"] = drawing_info['main_drawing']
+        info["source_drawing_number"] = drawing_info['source_drawing']
+        info["all_drawing_numbers"] = [dn[0] for dn in drawing_number_candidates]
+
+    del doc
+    gc.collect()
+    return info
+
+
 def process_multiple_dxf_files(dxf_files, filter_non_parts=False, sort_order="asc", debug=False,
                                 selected_layers=None, validate_ref_designators=False,
                                 extract_drawing_numbers_option=False, extract_title_option=False,
@@ -13,6 +13,14 @@ import pandas as pd
 
 from .extract_labels import extract_labels
 
+# xlsxwriter の書き込みオプション。ラベルは "=" や "+" で始まるものもあるため、
+# 文字列セルごとの数式・URL判定を行わずそのまま文字列として書く（判定のコストも省ける）
+_XLSX_WRITER_OPTIONS = {
+    'strings_to_formulas': False,
+    'strings_to_urls': False,
+    'strings_to_numbers': False,
+}
+
 
 def _load_labels_with_cache(
     file_path: str,
@@ -248,10 +256,13 @@ def filter_unchanged_by_prefix(unchanged_entries, prefixes: List[str]):
     if not prefixes:
         return []
 
+    # str.startswith はタプルを受け取り、いずれかの接頭辞に一致するかを1回の呼び出しで
+    # 判定できる（ラベルごとの any() ジェネレータを避ける。2026-07 変更）
+    prefix_tuple = tuple(prefixes)
     aggregated = {}
     for entry in unchanged_entries:
         label = entry['label']
-        if any(label.startswith(prefix) for prefix in prefixes):
+        if label.startswith(prefix_tuple):
             coord = entry['coordinate']
             key = (label, coord[0], coord[1])
             aggregated[key] = aggregated.get(key, 0) + entry['count']
@@ -290,7 +301,8 @@ def build_diff_labels_workbook(
     ]
 
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    with pd.ExcelWriter(output, engine='xlsxwriter',
+                        engine_kwargs={'options': _XLSX_WRITER_OPTIONS}) as writer:
         workbook = writer.book
 
         if not sheets and summary_data is None and total_data is None and invalid_data is None:
@@ -354,7 +366,8 @@ def build_diff_labels_workbook(
 def build_unchanged_labels_workbook(sheets: List[Dict]) -> bytes:
     """unchanged_labels.xlsx のバイナリデータを生成する。"""
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    with pd.ExcelWriter(output, engine='xlsxwriter',
+                        engine_kwargs={'options': _XLSX_WRITER_OPTIONS}) as writer:
         if not sheets:
             empty_df = pd.DataFrame(columns=['Label', 'Count', 'Coordinate X', 'Coordinate Y'])
             empty_df.to_excel(writer, sheet_name='NoData', index=False)
@@ -5,10 +5,25 @@ streamlit には依存しないため、`tests/` から直接ユニットテス
 （`model/pairing.py` と同じ方針）。
 """
 from io import BytesIO
-from datetime import datetime
+from datetime import datetime, date
+from collections import defaultdict
 
+import numpy as np
 import pandas as pd
 
+from .common_utils import get_excel_read_engine
+
+# 図面管理台帳の標準カラム（図面管理台帳.xlsx のフォーマットに準拠した並び順）。
+# すべて object dtype で扱う（エンティティ数カラムは通常は整数、完全新規図面の行では
+# "n/a" 文字列も入るため）。
+ENTITY_COUNT_COLUMNS = (
+    'Deleted Entities', 'Added Entities', 'Diff Entities', 'Unchanged Entities', 'Total Entities',
+)
+LEDGER_COLUMNS = (
+    'Child', 'Parent', 'Relation', 'Title', 'Subtitle', 'Recorded Date', 'Note',
+    *ENTITY_COUNT_COLUMNS,
+)
+
 
 def load_parent_child_master(uploaded_file):
     """
@@ -32,7 +47,10 @@ def load_parent_child_master(uploaded_file):
     """
     required_columns = ['Child', 'Parent']
     try:
-        excel_file = pd.ExcelFile(uploaded_file)
+        # calamine が使える環境では Rust 実装のリーダーで読む（2026-07 追加）。
+        # 他の列（Note 等の利用者による追記を含む）も台帳として保持して書き戻すため、
+        # usecols による列の絞り込みは行わない。
+        excel_file = pd.ExcelFile(uploaded_file, engine=get_excel_read_engine())
 
         target_sheet = excel_file.sheet_names[0]
         for sheet_name in excel_file.sheet_names:
@@ -41,18 +59,58 @@ def load_parent_child_master(uploaded_file):
                 target_sheet = sheet_name
                 break
 
-        df = pd.read_excel(excel_file, sheet_name=target_sheet)
+        # Child/Parent は図番（識別子）のため、数字のみの図番でも数値化されないよう
+        # 文字列として読む（照合・ソートを文字列で一貫させる）。
+        df = pd.read_excel(excel_file, sheet_name=target_sheet,
+                           dtype={col: str for col in required_columns})
 
         for col in required_columns:
             if col not in df.columns:
                 return None, f"必須カラム '{col}' が見つかりません。"
 
+        # 台帳の標準カラムの補完・旧 'Date' 列のリネーム・dtype の統一は読み込み時に
+        # 一度だけ行う（2026-07 追加）。update_parent_child_master() は読み込み後に
+        # 差分抽出のたびに呼ばれるため、そこでの補完は no-op になる。
+        _ensure_ledger_columns(df)
+
         return df, None
 
     except Exception as e:
         return None, f"図面管理台帳ファイルの読み込み中にエラーが発生しました: {str(e)}"
 
 
+def _ensure_ledger_columns(df):
+    """台帳の更新に必要な列が無ければ追加する（df をその場で変更する）"""
+    # 必要な列が存在しない場合は追加（文字列型として明示）
+    for col in ('Relation', 'Title', 'Subtitle'):
+        if col not in df.columns:
+            df[col] = pd.Series(dtype='object')
+    if 'Recorded Date' not in df.columns:
+        # 古い'Date'列があれば'Recorded Date'にリネーム
+        if 'Date' in df.columns:
+            df.rename(columns={'Date': 'Recorded Date'}, inplace=True)
+        else:
+            df['Recorded Date'] = None
+
+    # エンティティ数カラムを追加（存在しない場合）
+    # object dtype: 通常は整数、完全新規図面の行では "n/a" 文字列も入るため
+    for col in ENTITY_COUNT_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.Series(dtype='object')
+        elif df[col].dtype != object:
+            df[col] = df[col].astype(object)
+
+    if 'Note' not in df.columns:
+        df['Note'] = pd.Series(dtype='object')
+
+    # 読み込んだ台帳で列が全て空欄だと float64 になり、文字列や日時のスカラー代入が
+    # TypeError になるため、更新対象の列は object dtype に揃える（2026-07 追加）。
+    # 日時として読み込まれた Recorded Date 列はそのまま使う。
+    for col in ('Relation', 'Title', 'Subtitle', 'Recorded Date'):
+        if df[col].dtype != object and df[col].dtype.kind != 'M':
+            df[col] = df[col].astype(object)
+
+
 def update_parent_child_master(master_df, new_pairs):
     """
     図面管理台帳に新しいペアを追加、もしくは既存ペアを更新する
@@ -62,23 +120,49 @@ def update_parent_child_master(master_df, new_pairs):
         new_pairs: 新しいペア情報のリスト
 
     Returns:
-        tuple: (更新されたDataFrame, 追加された件数)
+        tuple: (更新されたDataFrame, 追加された件数)。更新対象が無い場合は
+        master_df そのもの（コピーではない）を返す
     """
+    # 図番（Child）を持つペアが1件も無ければ何も変わらないため、台帳全体のコピーを
+    # 作らずにそのまま返す（2026-07 追加）
+    if not any(pair.get('main_drawing') for pair in new_pairs):
+        return master_df, 0
+
     added_count = 0
     new_records = []
     updated_df = master_df.copy()
-
-    entity_count_columns = ['Deleted Entities', 'Added Entities', 'Diff Entities',
-                            'Unchanged Entities', 'Total Entities']
+    # 記録日時は1回の更新（1バッチ）で共通の値とする（2026-07 変更。以前はペアごとに
+    # datetime.now() を呼んでおり、同じバッチの行でも秒がずれることがあった）
+    recorded_at = datetime.now()
 
     # アップロードされた既存台帳で、まだ完全新規図面（"n/a"）の行が一度も無い場合、
     # pandas はエントリ数カラムを float64 として読み込む。この状態のカラムへ後段で
     # "n/a" 文字列を代入すると FutureWarning（将来的には TypeError）になるため、
     # 更新前に object dtype へ統一しておく（2026-07 追加。値は変えない）。
-    for col in entity_count_columns:
+    # load_parent_child_master() で読み込んだ台帳は読み込み時に統一済み。
+    for col in ENTITY_COUNT_COLUMNS:
         if col in updated_df.columns and updated_df[col].dtype != object:
             updated_df[col] = updated_df[col].astype(object)
 
+    # (Parent, Child) → 該当行の位置。ペアごとに台帳全体を比較するマスク演算
+    # （ペア数×行数）を避け、存在確認を辞書引きにする（2026-07 追加）。
+    # 台帳に元々重複行がある場合も従来のマスクと同じく全該当行を更新できるよう
+    # 位置はリストで持つ。更新は列位置（col_pos）と .iat によるスカラー代入で行い、
+    # ペアごとの .loc 代入（インデックス整列とブロック再構築）を避ける（2026-07 変更）。
+    row_positions_by_key = defaultdict(list)
+    for pos, key in enumerate(zip(updated_df['Parent'], updated_df['Child'])):
+        row_positions_by_key[key].append(pos)
+
+    # 既存レコードを更新する場合に必要な列の確認・追加は、最初の更新の直前に一度だけ行う
+    # （2026-07 変更。以前はペアごとに全列の存在確認をしていた）。新規追加のみのバッチでは
+    # 従来どおり列を追加しない。col_pos はその時点の列名 → 列位置。
+    col_pos = None
+
+    def set_values(positions, col, value):
+        col_idx = col_pos[col]
+        for pos in positions:
+            updated_df.iat[pos, col_idx] = value
+
     for pair in new_pairs:
         parent = pair.get('source_drawing')  # 流用元図番がParent
         child = pair.get('main_drawing')      # 図番がChild
@@ -96,66 +180,45 @@ def update_parent_child_master(master_df, new_pairs):
         parent_value = parent if parent else 'none'
 
         # 既存のレコードに同じ親子関係が存在するか確認
-        mask = (updated_df['Parent'] == parent_value) & (updated_df['Child'] == child)
-        exists = mask.any()
+        key = (parent_value, child)
+        positions = row_positions_by_key.get(key)
 
-        if exists:
+        if positions:
             # 既存レコードを更新（Child/Parent/Noteは保持）
-            current_date = datetime.now()
-
-            # 必要な列が存在しない場合は追加（文字列型として明示）
-            if 'Relation' not in updated_df.columns:
-                updated_df['Relation'] = pd.Series(dtype='object')
-            if 'Title' not in updated_df.columns:
-                updated_df['Title'] = pd.Series(dtype='object')
-            if 'Subtitle' not in updated_df.columns:
-                updated_df['Subtitle'] = pd.Series(dtype='object')
-            if 'Recorded Date' not in updated_df.columns:
-                # 古い'Date'列があれば'Recorded Date'にリネーム
-                if 'Date' in updated_df.columns:
-                    updated_df.rename(columns={'Date': 'Recorded Date'}, inplace=True)
-                else:
-                    updated_df['Recorded Date'] = None
-
-            # エンティティ数カラムを追加（存在しない場合）
-            # object dtype: 通常は整数、完全新規図面の行では "n/a" 文字列も入るため
-            for col in entity_count_columns:
-                if col not in updated_df.columns:
-                    updated_df[col] = pd.Series(dtype='object')
-
-            if 'Note' not in updated_df.columns:
-                updated_df['Note'] = pd.Series(dtype='object')
+            if col_pos is None:
+                _ensure_ledger_columns(updated_df)
+                col_pos = {col: idx for idx, col in enumerate(updated_df.columns)}
 
             if relation:
-                prev_relation_series = updated_df.loc[mask, 'Relation']
+                relation_col = col_pos['Relation']
+                prev_relations = [updated_df.iat[pos, relation_col] for pos in positions]
+                prev_relation = next((v for v in prev_relations if not pd.isna(v)), None)
                 relation_to_set = relation
-                if prev_relation_series.notna().any():
-                    prev_unique = prev_relation_series.dropna().unique()
-                    if len(prev_unique) > 0 and prev_unique[0] != relation:
-                        relation_to_set = f"{relation}-changed"
-                updated_df.loc[mask, 'Relation'] = relation_to_set
+                if prev_relation is not None and prev_relation != relation:
+                    relation_to_set = f"{relation}-changed"
+                set_values(positions, 'Relation', relation_to_set)
 
-            updated_df.loc[mask, 'Title'] = title
-            updated_df.loc[mask, 'Subtitle'] = subtitle
-            updated_df.loc[mask, 'Recorded Date'] = current_date
+            set_values(positions, 'Title', title)
+            set_values(positions, 'Subtitle', subtitle)
+            set_values(positions, 'Recorded Date', recorded_at)
 
             # エンティティ数を更新
             # 完全新規図面（流用元なし）: 比較を行っていないため Added=Total（その図面
             # 自体の総エンティティ数）とし、それ以外（Deleted/Diff/Unchanged）は
             # 比較対象が存在しないため "n/a" を明示する（2026-06 追加）。
             if is_brand_new:
-                updated_df.loc[mask, 'Deleted Entities'] = 'n/a'
-                updated_df.loc[mask, 'Diff Entities'] = 'n/a'
-                updated_df.loc[mask, 'Unchanged Entities'] = 'n/a'
+                set_values(positions, 'Deleted Entities', 'n/a')
+                set_values(positions, 'Diff Entities', 'n/a')
+                set_values(positions, 'Unchanged Entities', 'n/a')
                 if entity_counts:
-                    updated_df.loc[mask, 'Added Entities'] = entity_counts.get('added_entities')
-                    updated_df.loc[mask, 'Total Entities'] = entity_counts.get('total_entities')
+                    set_values(positions, 'Added Entities', entity_counts.get('added_entities'))
+                    set_values(positions, 'Total Entities', entity_counts.get('total_entities'))
             elif entity_counts:
-                updated_df.loc[mask, 'Deleted Entities'] = entity_counts.get('deleted_entities')
-                updated_df.loc[mask, 'Added Entities'] = entity_counts.get('added_entities')
-                updated_df.loc[mask, 'Diff Entities'] = entity_counts.get('diff_entities')
-                updated_df.loc[mask, 'Unchanged Entities'] = entity_counts.get('unchanged_entities')
-                updated_df.loc[mask, 'Total Entities'] = entity_counts.get('total_entities')
+                set_values(positions, 'Deleted Entities', entity_counts.get('deleted_entities'))
+                set_values(positions, 'Added Entities', entity_counts.get('added_entities'))
+                set_values(positions, 'Diff Entities', entity_counts.get('diff_entities'))
+                set_values(positions, 'Unchanged Entities', entity_counts.get('unchanged_entities'))
+                set_values(positions, 'Total Entities', entity_counts.get('total_entities'))
         else:
             # 新しいレコードを追加
             new_record = {
@@ -164,7 +227,7 @@ def update_parent_child_master(master_df, new_pairs):
                 'Relation': relation,
                 'Title': title,
                 'Subtitle': subtitle,
-                'Recorded Date': datetime.now()
+                'Recorded Date': recorded_at
             }
 
             # エンティティ数を追加（完全新規図面は上記と同じ規則。2026-06 追加）
@@ -183,14 +246,26 @@ def update_parent_child_master(master_df, new_pairs):
                 new_record['Total Entities'] = entity_counts.get('total_entities')
 
             new_records.append(new_record)
-            added_count += 1
 
     if new_records:
-        for record in new_records:
-            for key in record.keys():
-                if key not in updated_df.columns:
-                    updated_df[key] = pd.Series(dtype='object')
-            updated_df.loc[len(updated_df)] = record
+        # 1行ずつ updated_df.loc[len(updated_df)] で追加すると行ごとに DataFrame の
+        # 再確保が起きるため、新規行をまとめて DataFrame 化して1回の concat で追加する
+        # （2026-07 追加）。同一バッチ内で同じ (Parent, Child) が複数回現れた場合
+        # （同じDXFの重複アップロード等）は最初の1件のみ追加する。
+        new_df = pd.DataFrame.from_records(new_records).drop_duplicates(
+            ['Parent', 'Child'], keep='first', ignore_index=True)
+        if len(updated_df) == 0:
+            # 行の無い台帳（初回の取り込み）では結合相手が空のため concat せず、
+            # 新規行をそのまま台帳の列順に並べ替えて使う（2026-07 追加）。列構成・dtype は
+            # concat した場合と同じ（台帳の列の後ろに台帳に無い列）。
+            columns = list(updated_df.columns)
+            columns += [col for col in new_df.columns if col not in updated_df.columns]
+            updated_df = new_df.reindex(columns=columns).astype(object)
+        else:
+            # 台帳に無い列は concat が列の和集合（既存列の後ろに新しい列の順）として補う。
+            # 列を1つずつ追加してから結合する必要はない（2026-07 変更）。
+            updated_df = pd.concat([updated_df, new_df.astype(object)], ignore_index=True)
+        added_count = len(new_df)
 
     return updated_df, added_count
 
@@ -222,26 +297,57 @@ def make_dataframe_arrow_compatible(df):
 
 def create_empty_master_df():
     """空の図面管理台帳DataFrameを作成（図面管理台帳.xlsx のフォーマットに準拠）"""
-    return pd.DataFrame({
-        'Child': pd.Series(dtype='object'),
-        'Parent': pd.Series(dtype='object'),
-        'Relation': pd.Series(dtype='object'),
-        'Title': pd.Series(dtype='object'),
-        'Subtitle': pd.Series(dtype='object'),
-        'Recorded Date': pd.Series(dtype='object'),
-        'Note': pd.Series(dtype='object'),
-        # object dtype: 通常は整数、完全新規図面の行では "n/a" 文字列も入るため
-        'Deleted Entities': pd.Series(dtype='object'),
-        'Added Entities': pd.Series(dtype='object'),
-        'Diff Entities': pd.Series(dtype='object'),
-        'Unchanged Entities': pd.Series(dtype='object'),
-        'Total Entities': pd.Series(dtype='object'),
-    })
+    return pd.DataFrame({col: pd.Series(dtype='object') for col in LEDGER_COLUMNS})
+
+
+def _write_dataframe_rows(workbook, worksheet, df):
+    """DataFrame をヘッダー行＋データ行の順に1行ずつワークシートへ書き込む。
+
+    constant_memory モードの xlsxwriter は行単位でディスクへ書き出すため、
+    列単位でセルを書き込む DataFrame.to_excel() を使うと最後の列以外が失われる。
+    そのため to_excel(index=False) と同じ見た目（ヘッダー書式・日時書式・欠損値は
+    空セル）になるよう行順に書き込む（2026-07 追加）。
+    """
+    header_fmt = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    datetime_fmt = workbook.add_format({'num_format': 'YYYY-MM-DD HH:MM:SS'})
+    date_fmt = workbook.add_format({'num_format': 'YYYY-MM-DD'})
+
+    for col_idx, col_name in enumerate(df.columns):
+        worksheet.write(0, col_idx, col_name, header_fmt)
+
+    for row_idx, values in enumerate(df.itertuples(index=False, name=None), start=1):
+        for col_idx, value in enumerate(values):
+            if isinstance(value, np.generic):
+                value = value.item()
+            if pd.api.types.is_scalar(value) and pd.isna(value):
+                continue
+            if isinstance(value, datetime):
+                worksheet.write_datetime(row_idx, col_idx, value.replace(tzinfo=None), datetime_fmt)
+            elif isinstance(value, date):
+                worksheet.write_datetime(row_idx, col_idx, value, date_fmt)
+            else:
+                worksheet.write(row_idx, col_idx, value)
 
 
 def save_master_to_bytes(master_df, pairs=None, mode=None, total_drawings_count=None):
     """
-    図面管理台帳DataFrameをExcelバイトデータに変換
+    図面管理台帳DataFrameをExcelバイトデータに変換（内容は write_master_excel() を参照）
+
+    Returns:
+        bytes: Excelファイルのバイトデータ
+    """
+    output = BytesIO()
+    write_master_excel(output, master_df, pairs=pairs, mode=mode,
+                       total_drawings_count=total_drawings_count)
+    return output.getvalue()
+
+
+def write_master_excel(output, master_df, pairs=None, mode=None, total_drawings_count=None):
+    """
+    図面管理台帳DataFrameをExcelとして output（書き込み可能なファイルオブジェクト）へ書き出す
+
+    ZIP のメンバー（ZipFile.open(name, 'w')）を直接渡せるよう、output はシーク不要
+    （2026-07 追加。save_master_to_bytes() から分離し、台帳全体の bytes を中間に持たない）。
 
     シート構成:
       1. Summary  : 統計サマリー（エンティティ合計・図形変更率・図面統計・流用率）
@@ -254,8 +360,6 @@ def save_master_to_bytes(master_df, pairs=None, mode=None, total_drawings_count=
               Type A は「アップロード図面総数」、Type B/C は「流用先図面総数」を分母に使う。
         total_drawings_count: 図面統計の分母件数（呼び出し側で mode に応じて算出する）
 
-    Returns:
-        bytes: Excelファイルのバイトデータ
     """
     if mode == 'all_in_one':
         total_drawings_label = 'アップロード図面総数'
@@ -263,8 +367,17 @@ def save_master_to_bytes(master_df, pairs=None, mode=None, total_drawings_count=
     else:
         total_drawings_label = '流用先図面総数'
         total_entities_label = '流用先図面 図形総数'
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    # constant_memory: 行を書き終えるたびにディスクへ書き出して解放し、台帳全体を
+    # セルオブジェクトとしてメモリに保持しない（2026-07 追加）。このモードでは各シートを
+    # 行の昇順に書く必要があるため、Summary は上から順に、Diff List は
+    # _write_dataframe_rows() で行単位に書き込む（to_excel は列単位のため使えない）。
+    # strings_to_*: 文字列セルごとの URL・数式判定を行わず、タイトルや Note の文字列を
+    # そのまま文字列として書く（2026-07 追加。"=" で始まる文字列が数式化されることも防ぐ）。
+    with pd.ExcelWriter(output, engine='xlsxwriter',
+                        engine_kwargs={'options': {'constant_memory': True,
+                                                   'strings_to_urls': False,
+                                                   'strings_to_formulas': False,
+                                                   'strings_to_numbers': False}}) as writer:
         workbook = writer.book
 
         # --- Summary シート（先に追加してタブ順を先頭にする） ---
@@ -338,7 +451,4 @@ def save_master_to_bytes(master_df, pairs=None, mode=None, total_drawings_count=
         diff_list_df = master_df
         if 'Child' in master_df.columns:
             diff_list_df = master_df.sort_values('Child', kind='stable', na_position='last')
-        diff_list_df.to_excel(writer, sheet_name='Diff List', index=False)
-
-    output.seek(0)
-    return output.getvalue()
+        _write_dataframe_rows(workbook, workbook.add_worksheet('Diff List'), diff_list_df)
@@ -17,6 +17,7 @@ streamlit には依存しないため、`tests/` から直接ユニットテス
     relation         : RELATION_* のいずれか or None
     title / subtitle : 流用先の図面名（無ければ None）
 """
+import re
 from collections import defaultdict
 
 # --- 関係(relation) ---
@@ -33,6 +34,9 @@ STATUS_ONE_SIDED = 'one_sided'                # 片側図番が空白（C のみ
 STATUS_IDENTICAL = 'identical'                # 流用元==流用先（比較対象外・C のみ）
 STATUS_NO_SOURCE_DEFINED = 'no_source_defined'  # 流用元図番未記入
 
+# ベース図番 + 末尾1文字の Revision 識別子（半角英大文字 A-Z / 全角英大文字 Ａ-Ｚ）
+_REVISION_SUFFIX_RE = re.compile(r'(.+)([A-Z\uFF21-\uFF3A])', re.DOTALL)
+
 
 def extract_base_drawing_number(drawing_number):
     """
@@ -46,20 +50,28 @@ def extract_base_drawing_number(drawing_number):
     Returns:
         tuple: (ベース図番, Revision識別子) または (None, None)
     """
-    if not drawing_number or len(drawing_number) < 2:
+    # 1回の正規表現照合で判定する（2026-07 変更。以前は isalpha/isupper と全角範囲の
+    # 比較を個別に行っていた。半角・全角英大文字以外の大文字（ギリシャ文字等）は対象外）
+    match = _REVISION_SUFFIX_RE.fullmatch(drawing_number) if drawing_number else None
+    if match is None:
         return None, None
+    return match.group(1), match.group(2)
 
-    last_char = drawing_number[-1]
-
-    # 英大文字（半角）
-    if last_char.isalpha() and last_char.isupper():
-        return drawing_number[:-1], last_char
 
-    # 全角英大文字（Ａ-Ｚ）
-    if 'Ａ' <= last_char <= 'Ｚ':
-        return drawing_number[:-1], last_char
+def _group_by_base_drawing_number(files):
+    """図番をベース図番ごとにまとめ、各グループを Revision 識別子順に並べて返す。
 
-    return None, None
+    Returns:
+        dict: ベース図番 → [(図番, Revision識別子), ...]（Revision 昇順）
+    """
+    base_map = defaultdict(list)
+    for drawing_number in files:
+        base, revision = extract_base_drawing_number(drawing_number)
+        if base and revision:
+            base_map[base].append((drawing_number, revision))
+    for group in base_map.values():
+        group.sort(key=lambda x: x[1])
+    return base_map
 
 
 def find_revup_pairs(source_files, target_files):
@@ -78,27 +90,22 @@ def find_revup_pairs(source_files, target_files):
     Returns:
         tuple: (RevUpペアのリスト, 使用された流用元図番のセット, 使用された流用先図番のセット)
     """
-    source_base_map = defaultdict(list)
-    for drawing_number in source_files.keys():
-        base, revision = extract_base_drawing_number(drawing_number)
-        if base and revision:
-            source_base_map[base].append((drawing_number, revision))
-
-    target_base_map = defaultdict(list)
-    for drawing_number in target_files.keys():
-        base, revision = extract_base_drawing_number(drawing_number)
-        if base and revision:
-            target_base_map[base].append((drawing_number, revision))
+    source_base_map = _group_by_base_drawing_number(source_files)
+    # 方式 A（同一プール）ではグルーピング・ソート結果も同一のため1回で済ませる（2026-07 追加）
+    if target_files is source_files:
+        target_base_map = source_base_map
+    else:
+        target_base_map = _group_by_base_drawing_number(target_files)
 
     revup_pairs = []
     used_source = set()
     used_target = set()
 
-    common_bases = set(source_base_map.keys()) & set(target_base_map.keys())
+    common_bases = source_base_map.keys() & target_base_map.keys()
 
     for base in common_bases:
-        source_drawings = sorted(source_base_map[base], key=lambda x: x[1])
-        target_drawings = sorted(target_base_map[base], key=lambda x: x[1])
+        source_drawings = source_base_map[base]
+        target_drawings = target_base_map[base]
 
         # 流用元（旧リビジョン）と流用先（新リビジョン）をマッチング
         for old_drawing, old_rev in source_drawings:
@@ -180,8 +187,9 @@ def build_pairs(source_files, target_files, progress_callback=None):
 
         if source_drawing and source_drawing != main_drawing:
             key = (main_drawing, source_drawing)
+            # 流用元ファイルの検索はペア生成と孤立判定で共用する（辞書引きは1回）
+            source_file_info = source_files.get(source_drawing)
             if key not in pair_keys:
-                source_file_info = source_files.get(source_drawing)
                 pairs.append({
                     'main_drawing': main_drawing,
                     'source_drawing': source_drawing,
@@ -194,7 +202,7 @@ def build_pairs(source_files, target_files, progress_callback=None):
                 })
                 pair_keys.add(key)
             paired_drawings.add(main_drawing)
-            if source_drawing in source_files:
+            if source_file_info is not None:
                 paired_drawings.add(source_drawing)
 
         processed_targets += 1
@@ -239,9 +247,10 @@ def build_pairs_from_list(pair_list_df, all_files_dict):
         list: ペア情報のリスト
     """
     pairs = []
-    for _, row in pair_list_df.iterrows():
-        ref_drawing = str(row['流用元図番']).strip()
-        target_drawing = str(row['流用先図番']).strip()
+    # 行ごとに Series を作る iterrows() を避け、2列を直接 zip で走査する（2026-07 変更）
+    for ref_value, target_value in zip(pair_list_df['流用元図番'], pair_list_df['流用先図番']):
+        ref_drawing = str(ref_value).strip()
+        target_drawing = str(target_value).strip()
 
         ref_file_info = all_files_dict.get(ref_drawing) if ref_drawing else None
         target_file_info = all_files_dict.get(target_drawing) if target_drawing else None
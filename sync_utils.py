@@ -19,7 +19,8 @@ The extract_labels.py file uses try/except to work in both environments:
 import os
 import sys
 import shutil
-import subprocess
+import difflib
+import py_compile
 from pathlib import Path
 from datetime import datetime
 from typing import Tuple, Dict, List, Optional
@@ -68,26 +69,52 @@ def print_colored(text: str, color: str = Color.ENDC):
     print(f"{color}{text}{Color.ENDC}")
 
 
+HASH_CHUNK_SIZE = 1 << 16
+
+
+def hash_file(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file, read in fixed-size chunks.
+
+    Chunks are read into one reusable buffer, so the whole file is never held in memory.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb') as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
 def get_file_info(file_path: Path) -> Optional[Dict]:
-    """Get file information including size, mtime, and hash"""
+    """Get file information (size, mtime). The content hash is computed lazily by files_identical()."""
     if not file_path.exists():
         return None
 
     stat = file_path.stat()
 
-    # Calculate file hash
-    with open(file_path, 'rb') as f:
-        file_hash = hashlib.md5(f.read()).hexdigest()
-
     return {
         'path': file_path,
         'size': stat.st_size,
         'mtime': stat.st_mtime,
         'mtime_str': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-        'hash': file_hash,
     }
 
 
+def files_identical(info_a: Dict, info_b: Dict) -> bool:
+    """Return True if both files have the same content.
+
+    Files of different sizes cannot be identical, so they are never read; only
+    same-size pairs are hashed.
+    """
+    if info_a['size'] != info_b['size']:
+        return False
+    return hash_file(info_a['path']) == hash_file(info_b['path'])
+
+
 def compare_projects() -> Tuple[str, Dict[str, Dict]]:
     """
     Compare both projects and determine which should be the master.
@@ -117,7 +144,7 @@ def compare_projects() -> Tuple[str, Dict[str, Dict]]:
 
         # Determine which is newer
         if info_a and info_b:
-            if info_a['hash'] == info_b['hash']:
+            if files_identical(info_a, info_b):
                 status = "同一"
                 symbol = "="
                 color = Color.OKGREEN
@@ -192,21 +219,23 @@ def compare_projects() -> Tuple[str, Dict[str, Dict]]:
 
 
 def run_diff(file_a: Path, file_b: Path) -> bool:
-    """Run diff command and show differences"""
+    """Show a unified diff (file_b -> file_a) and return True if the files differ.
+
+    Uses difflib in-process instead of spawning the external `diff` command per file.
+    """
     try:
-        result = subprocess.run(
-            ['diff', '-u', str(file_b), str(file_a)],
-            capture_output=True,
-            text=True
-        )
+        a_lines = file_a.read_text(encoding='utf-8', errors='replace').splitlines()
+        b_lines = file_b.read_text(encoding='utf-8', errors='replace').splitlines()
+        lines = list(difflib.unified_diff(
+            b_lines, a_lines, fromfile=str(file_b), tofile=str(file_a), lineterm=''
+        ))
 
-        if result.returncode == 0:
+        if not lines:
             print_colored("  ✓ ファイルは同一です", Color.OKGREEN)
             return False
         else:
             print_colored("  差分あり:", Color.WARNING)
             # Show first 20 lines of diff
-            lines = result.stdout.split('\n')
             for line in lines[:20]:
                 if line.startswith('+'):
                     print_colored(f"    {line}", Color.OKGREEN)
@@ -305,19 +334,14 @@ def verify_syntax(project_dir: Path) -> bool:
 
     for file_path in files_to_check:
         try:
-            result = subprocess.run(
-                ['python3', '-m', 'py_compile', str(file_path)],
-                capture_output=True,
-                text=True,
-                cwd=project_dir
-            )
-
-            if result.returncode == 0:
-                print_colored(f"  ✓ {file_path.name}", Color.OKGREEN)
-            else:
-                print_colored(f"  ✗ {file_path.name}", Color.FAIL)
-                print_colored(f"    {result.stderr}", Color.FAIL)
-                all_ok = False
+            # Compile in-process rather than spawning `python3 -m py_compile` per file
+            py_compile.compile(str(file_path), doraise=True)
+            print_colored(f"  ✓ {file_path.name}", Color.OKGREEN)
+
+        except py_compile.PyCompileError as e:
+            print_colored(f"  ✗ {file_path.name}", Color.FAIL)
+            print_colored(f"    {e.msg}", Color.FAIL)
+            all_ok = False
 
         except Exception as e:
             print_colored(f"  ✗ {file_path.name}: {e}", Color.FAIL)
@@ -0,0 +1,94 @@
+"""
+model.common_utils（UI 非依存）のユニットテスト。
+
+実行:
+    cd DXF-diff-manager
+    python -m tests.unit.test_common_utils
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from model.common_utils import (
+    save_uploadedfile, uploaded_file_digest, create_session_temp_dir, cleanup_stale_temp_files, TEMP_FILE_PREFIX,
+    get_excel_read_engine,
+)
+
+
+class _Upload:
+    """Streamlit の UploadedFile の代用（name と getbuffer() のみ）"""
+
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+
+def test_save_uploadedfile_with_dir_reuses_file_for_same_content():
+    """dir 指定時は内容ハッシュで命名し、同じ内容は同じパスを再利用する。"""
+    with tempfile.TemporaryDirectory() as d:
+        first = save_uploadedfile(_Upload('A.dxf', b'0\nEOF\n'), dir=d)
+        second = save_uploadedfile(_Upload('B.dxf', b'0\nEOF\n'), dir=d)
+        other = save_uploadedfile(_Upload('A.dxf', b'0\nSECTION\n0\nEOF\n'), dir=d)
+
+        assert first == second
+        assert first != other
+        assert os.path.dirname(first) == d and first.endswith('.dxf')
+        assert sorted(os.listdir(d)) == sorted({os.path.basename(first), os.path.basename(other)})
+        with open(first, 'rb') as f:
+            assert f.read() == b'0\nEOF\n'
+
+        # 計算済みの内容ハッシュを渡した場合も同じパスになる
+        upload = _Upload('C.dxf', b'0\nEOF\n')
+        assert save_uploadedfile(upload, dir=d, digest=uploaded_file_digest(upload)) == first
+        assert os.path.basename(first) == uploaded_file_digest(upload) + '.dxf'
+
+
+def test_cleanup_stale_temp_files_removes_old_session_dirs_only():
+    """孤立したセッション用一時ディレクトリは古いものだけ中身ごと削除される。"""
+    old_dir = create_session_temp_dir()
+    new_dir = create_session_temp_dir()
+    try:
+        assert os.path.basename(old_dir).startswith(TEMP_FILE_PREFIX)
+        save_uploadedfile(_Upload('A.dxf', b'data'), dir=old_dir)
+        stale = time.time() - 4 * 60 * 60
+        os.utime(old_dir, (stale, stale))
+
+        cleanup_stale_temp_files()
+
+        assert not os.path.exists(old_dir)
+        assert os.path.isdir(new_dir)
+    finally:
+        for d in (old_dir, new_dir):
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def test_get_excel_read_engine_falls_back_on_pandas_before_2_2(monkeypatch):
+    """engine='calamine' を受け付けない pandas 2.2 未満では calamine を選ばない。"""
+    monkeypatch.setattr(pd, '__version__', '2.1.4')
+    assert get_excel_read_engine() is None
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith('test_') and callable(v)]
+    failures = []
+    for t in tests:
+        try:
+            t()
+            print(f"PASS: {t.__name__}")
+        except AssertionError as e:
+            failures.append(t.__name__); print(f"FAIL: {t.__name__}\n      {e}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(_run_all())
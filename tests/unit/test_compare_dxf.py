@@ -208,6 +208,39 @@ def test_file_a_only_is_deleted_file_b_only_is_added():
         assert by_layer.get('ADDED') == 'ONLY_IN_B'
 
 
+def test_output_to_binary_stream_matches_file_output():
+    """output_file に BytesIO を渡すと、一時ファイルを経由せずにファイル出力と同じ
+    内容の差分DXF（日本語テキストを含む UTF-8）がストリームへ書き込まれ、
+    ストリームは閉じられずに残る。"""
+    import io
+    import tempfile
+
+    doc_a = ezdxf.new()
+    doc_a.modelspace().add_text('旧図面のみ', dxfattribs={'insert': (0, 0)})
+    doc_b = ezdxf.new()
+    doc_b.modelspace().add_text('新図面のみ', dxfattribs={'insert': (100, 100)})
+
+    with tempfile.TemporaryDirectory() as d:
+        path_a = os.path.join(d, 'a.dxf')
+        path_b = os.path.join(d, 'b.dxf')
+        out_path = os.path.join(d, 'out.dxf')
+        doc_a.saveas(path_a)
+        doc_b.saveas(path_b)
+
+        ok_file, counts_file = compare_dxf_files_and_generate_dxf(path_a, path_b, out_path)
+        buffer = io.BytesIO()
+        ok_stream, counts_stream = compare_dxf_files_and_generate_dxf(path_a, path_b, buffer)
+
+        assert ok_file and ok_stream
+        assert counts_stream == counts_file
+        assert not buffer.closed
+
+        out_doc = ezdxf.read(io.StringIO(buffer.getvalue().decode('utf-8')))
+        by_layer = {e.dxf.layer: e.dxf.text for e in out_doc.modelspace() if e.dxftype() == 'TEXT'}
+        assert by_layer.get('DELETED') == '旧図面のみ'
+        assert by_layer.get('ADDED') == '新図面のみ'
+
+
 # --- ignore_color_only_changes: 座標・形状が一致し color だけ異なる場合の扱い ---
 
 def test_color_only_difference_detected_by_default():
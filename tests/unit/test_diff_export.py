@@ -220,6 +220,168 @@ def test_ignore_moved_labels_combined_with_prefix_filter_and_ref_designator_chec
         assert unchanged_df.iloc[0]['Coordinate X'] == 100.0  # 新座標を採用
 
 
+def test_zip_output_writes_archive_to_given_path():
+    """zip_output を指定すると ZIP がそのパスへ直接書き出され、戻り値の zip_data は
+    None になる（app.py は一時ファイルのパスのみ session_state に保持する）。
+    """
+    with tempfile.TemporaryDirectory() as d:
+        pairs = [_make_pair_dxf_files(d, 'NEW-001', 'OLD-001', 'NEW_ONLY', 'OLD_ONLY')]
+        zip_path = os.path.join(d, 'out.zip')
+
+        zip_data, results, diff_labels_excel, _, _ = create_diff_zip(pairs, zip_output=zip_path)
+
+        assert zip_data is None
+        assert results[0]['success']
+        with zipfile.ZipFile(zip_path) as zf:
+            names = zf.namelist()
+            assert results[0]['output_filename'] in names
+            assert zf.read('diff_labels.xlsx') == diff_labels_excel
+
+
+def test_diff_dxf_streamed_from_disk_without_keeping_bytes_or_temp_files():
+    """差分DXFは一時ファイルから zip_file.write() で逐次書き込まれ、results に
+    DXF のバイト列を保持せず、一時出力ファイルも処理後に残らないことを保証する
+    （ペア数に比例してメモリ・ディスクを占有しないための回帰テスト）。
+    """
+    with tempfile.TemporaryDirectory() as d, tempfile.TemporaryDirectory() as tmp_out:
+        pairs = [
+            _make_pair_dxf_files(d, 'A-DRAW', 'A-SRC', 'A_NEW', 'A_OLD'),
+            _make_pair_dxf_files(d, 'B-DRAW', 'B-SRC', 'B_NEW', 'B_OLD'),
+        ]
+        original_tempdir = tempfile.tempdir
+        tempfile.tempdir = tmp_out
+        try:
+            zip_data, results, _, _, _ = create_diff_zip(pairs)
+        finally:
+            tempfile.tempdir = original_tempdir
+
+        assert all(r['success'] for r in results)
+        for r in results:
+            assert not any(isinstance(v, (bytes, bytearray)) for v in r.values()), \
+                f"results に DXF のバイト列が保持されている: {list(r.keys())}"
+        assert os.listdir(tmp_out) == [], f"一時出力ファイルが残っている: {os.listdir(tmp_out)}"
+
+        with zipfile.ZipFile(io.BytesIO(zip_data)) as zf:
+            assert {'A-DRAW_vs_A-SRC.dxf', 'B-DRAW_vs_B-SRC.dxf'} <= set(zf.namelist())
+
+
+def test_zip_members_use_per_member_compression():
+    """xlsx メンバーは再圧縮せず STORED、差分DXFはサイズが閾値以上の場合のみ
+    DEFLATED で格納される。"""
+    from model.diff_export import DXF_DEFLATE_MIN_SIZE
+    with tempfile.TemporaryDirectory() as d:
+        pairs = [_make_pair_dxf_files(d, 'NEW-001', 'OLD-001', 'NEW_ONLY', 'OLD_ONLY')]
+        zip_data, _, _, _, _ = create_diff_zip(pairs)
+
+        with zipfile.ZipFile(io.BytesIO(zip_data)) as zf:
+            for info in zf.infolist():
+                if info.filename.endswith('.xlsx'):
+                    assert info.compress_type == zipfile.ZIP_STORED, info.filename
+                else:
+                    expected = (zipfile.ZIP_DEFLATED if info.file_size >= DXF_DEFLATE_MIN_SIZE
+                                else zipfile.ZIP_STORED)
+                    assert info.compress_type == expected, info.filename
+
+
+def test_process_pool_results_match_sequential_in_pair_order():
+    """max_workers>1（プロセスプールでラベル比較・差分DXFを並列実行）でも、results の順序・
+    エンティティ数・ラベル数・ZIP のメンバーが逐次処理（max_workers=1）と一致することを保証する。
+    """
+    with tempfile.TemporaryDirectory() as d:
+        pairs = [
+            _make_pair_dxf_files(d, 'C-DRAW', 'C-SRC', 'C_NEW', 'C_OLD'),
+            _make_pair_dxf_files(d, 'A-DRAW', 'A-SRC', 'A_NEW', 'A_OLD'),
+            _make_pair_dxf_files(d, 'B-DRAW', 'B-SRC', 'B_NEW', 'B_OLD'),
+        ]
+
+        seq_zip, seq_results, _, _, _ = create_diff_zip(pairs, max_workers=1)
+        with tempfile.TemporaryDirectory() as tmp_out:
+            original_tempdir = tempfile.tempdir
+            tempfile.tempdir = tmp_out
+            try:
+                par_zip, par_results, _, _, _ = create_diff_zip(pairs, max_workers=2)
+            finally:
+                tempfile.tempdir = original_tempdir
+            # ワーカーの一時出力ディレクトリはバッチ終了時に削除される
+            assert os.listdir(tmp_out) == [], f"一時出力が残っている: {os.listdir(tmp_out)}"
+
+        assert [r['main_drawing'] for r in par_results] == ['C-DRAW', 'A-DRAW', 'B-DRAW']
+        compared_keys = ('success', 'entity_counts', 'change_label_count', 'unchanged_label_count')
+        assert [[r[k] for k in compared_keys] for r in par_results] == \
+            [[r[k] for k in compared_keys] for r in seq_results]
+        with zipfile.ZipFile(io.BytesIO(seq_zip)) as seq_zf, zipfile.ZipFile(io.BytesIO(par_zip)) as par_zf:
+            assert par_zf.namelist() == seq_zf.namelist()
+
+
+def test_default_workers_skip_process_pool_for_small_batches_or_single_cpu(monkeypatch):
+    """max_workers 省略時、ペア数が MIN_PAIRS_FOR_DIFF_WORKERS 未満、または使える CPU が
+    1 つだけならプロセスプールを起動せず逐次処理する。"""
+    from model import diff_export
+    from config import diff_config
+
+    def fail_submit(*args, **kwargs):
+        raise AssertionError("プロセスプールが起動された")
+
+    monkeypatch.setattr(diff_export, '_submit_pair_jobs', fail_submit)
+    with tempfile.TemporaryDirectory() as d:
+        pairs = [_make_pair_dxf_files(d, f'{i}-DRAW', f'{i}-SRC', f'N{i}', f'O{i}')
+                 for i in range(diff_config.MIN_PAIRS_FOR_DIFF_WORKERS)]
+
+        _, results, _, _, _ = create_diff_zip(pairs[:-1])
+        assert len(results) == len(pairs) - 1
+
+        monkeypatch.setattr(diff_export, '_available_cpu_count', lambda: 1)
+        _, results, _, _, _ = create_diff_zip(pairs)
+        assert [r['success'] for r in results] == [True] * len(pairs)
+
+
+def test_no_complete_pairs_and_no_master_builds_nothing():
+    """complete ペアも台帳も無い場合は空のExcel・ZIPを組み立てずに返す。"""
+    pairs = [{'main_drawing': 'NEW-001', 'source_drawing': 'OLD-001', 'status': 'missing_source',
+              'main_file_info': None, 'source_file_info': None}]
+
+    zip_data, results, diff_labels_excel, unchanged_labels_excel, master_df = create_diff_zip(pairs)
+    assert zip_data == b""
+    assert results == []
+    assert diff_labels_excel is None and unchanged_labels_excel is None and master_df is None
+
+    with tempfile.TemporaryDirectory() as d:
+        zip_path = os.path.join(d, 'out.zip')
+        zip_data, _, _, _, _ = create_diff_zip(pairs, zip_output=zip_path)
+        assert zip_data is None
+        assert not os.path.exists(zip_path)
+
+
+def test_deflated_dxf_member_round_trips():
+    """deflate 格納した差分DXFは展開・CRC 検証でき、元の内容と一致する。"""
+    from model.diff_export import _write_dxf_member, DXF_DEFLATE_MIN_SIZE
+    payload = b"0\nLINE\n8\nADDED\n" * (DXF_DEFLATE_MIN_SIZE // 8)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as zf:
+        _write_dxf_member(zf, 'big.dxf', io.BytesIO(payload))
+
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zf:
+        info = zf.getinfo('big.dxf')
+        assert info.compress_type == zipfile.ZIP_DEFLATED
+        assert info.compress_size < info.file_size == len(payload)
+        assert zf.testzip() is None
+        assert zf.read('big.dxf') == payload
+
+
+def test_master_ledger_streamed_into_zip_member():
+    """台帳Excelは ZIP メンバーへ直接書き出され、展開して読み込める。"""
+    from model.master_ledger import create_empty_master_df
+    with tempfile.TemporaryDirectory() as d:
+        pairs = [_make_pair_dxf_files(d, 'NEW-001', 'OLD-001', 'NEW_ONLY', 'OLD_ONLY')]
+        zip_data, _, _, _, master_df = create_diff_zip(
+            pairs, master_df=create_empty_master_df(), master_filename='ledger.xlsx')
+
+    with zipfile.ZipFile(io.BytesIO(zip_data)) as zf:
+        assert zf.testzip() is None
+        ledger = pd.read_excel(io.BytesIO(zf.read('ledger.xlsx')), sheet_name='Diff List')
+    assert list(ledger['Child']) == list(master_df['Child']) == ['NEW-001']
+
+
 def _run_all():
     tests = [v for k, v in sorted(globals().items()) if k.startswith('test_') and callable(v)]
     failures = []
@@ -0,0 +1,85 @@
+"""
+model.extract_labels（UI 非依存）のユニットテスト。
+
+実行:
+    cd DXF-diff-manager
+    python -m tests.unit.test_extract_labels
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import ezdxf
+
+from model.extract_labels import extract_labels, extract_drawing_numbers_only
+
+
+def _save_titleblock_dxf(d, filename):
+    """図番・流用元図番をタイトルブロック（ブロック INSERT）内に持つDXFを作成する。"""
+    doc = ezdxf.new()
+    block = doc.blocks.new('TITLE')
+    block.add_text('DWG No.', dxfattribs={'insert': (0, 0)})
+    block.add_text('EE1234-567-89B', dxfattribs={'insert': (20, 0)})
+    block.add_text('流用元図番', dxfattribs={'insert': (0, -10)})
+    block.add_text('EE1234-567-89A', dxfattribs={'insert': (20, -10)})
+    msp = doc.modelspace()
+    msp.add_blockref('TITLE', (100, 100))
+    msp.add_text('R10', dxfattribs={'insert': (0, 0)})
+    path = os.path.join(d, filename)
+    doc.saveas(path)
+    return path
+
+
+def test_extract_drawing_numbers_only_matches_extract_labels():
+    """extract_drawing_numbers_only() は extract_labels(extract_drawing_numbers_option=True)
+    と同じ図番・流用元図番を返す（アップロード時の軽量な抽出経路の回帰テスト）。"""
+    with tempfile.TemporaryDirectory() as d:
+        path = _save_titleblock_dxf(d, 'tmp_upload.dxf')
+
+        _, full_info = extract_labels(
+            path,
+            filter_non_parts=False,
+            sort_order="none",
+            selected_layers=None,
+            extract_drawing_numbers_option=True,
+            extract_title_option=False,
+            original_filename='EE1234-567-89B.dxf',
+        )
+        light_info = extract_drawing_numbers_only(path, original_filename='EE1234-567-89B.dxf')
+
+        assert full_info['main_drawing_number'] == 'EE1234-567-89B'
+        for key in ('main_drawing_number', 'source_drawing_number', 'all_drawing_numbers'):
+            assert light_info[key] == full_info[key], key
+
+
+def test_extract_drawing_numbers_only_raises_on_read_error():
+    """読み込めないファイルでは結果を返さず例外を送出する（呼び出し元がエラーとして表示する）。"""
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'broken.dxf')
+        with open(path, 'w') as f:
+            f.write('not a dxf')
+        try:
+            extract_drawing_numbers_only(path)
+        except Exception:
+            pass
+        else:
+            raise AssertionError("読み込めないファイルで例外が送出されなかった")
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith('test_') and callable(v)]
+    failures = []
+    for t in tests:
+        try:
+            t()
+            print(f"PASS: {t.__name__}")
+        except AssertionError as e:
+            failures.append(t.__name__); print(f"FAIL: {t.__name__}\n      {e}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(_run_all())
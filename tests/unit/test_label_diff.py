@@ -18,6 +18,7 @@ from model.label_diff import (
     round_labels_with_coordinates,
     find_label_change_pairs,
     reclassify_moved_labels,
+    filter_unchanged_by_prefix,
 )
 
 
@@ -113,6 +114,20 @@ def test_ignore_moved_labels_disabled_by_default_via_compute_label_differences(t
     assert sig.parameters['ignore_moved_labels'].default is False
 
 
+def test_filter_unchanged_by_prefix_accepts_list_or_tuple():
+    """接頭辞はリスト・タプルのどちらで渡しても同じ結果になり、座標ごとに件数を合算する。"""
+    entries = [
+        {'label': 'CN1', 'coordinate': (0.0, 0.0), 'count': 1},
+        {'label': 'CN1', 'coordinate': (0.0, 0.0), 'count': 2},
+        {'label': 'TB3', 'coordinate': (1.0, 2.0), 'count': 1},
+        {'label': 'R10', 'coordinate': (5.0, 5.0), 'count': 1},
+    ]
+    rows = filter_unchanged_by_prefix(entries, ['CN', 'TB'])
+    assert rows == filter_unchanged_by_prefix(entries, ('CN', 'TB'))
+    assert [(r['Label'], r['Count']) for r in rows] == [('CN1', 3), ('TB3', 1)]
+    assert filter_unchanged_by_prefix(entries, ()) == []
+
+
 def _run_all():
     tests = [v for k, v in sorted(globals().items()) if k.startswith('test_') and callable(v)]
     failures = []
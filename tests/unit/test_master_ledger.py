@@ -8,8 +8,10 @@ streamlit に依存しないため app.py をインポートせず、コアを
     cd DXF-diff-manager
     python -m tests.unit.test_master_ledger
 """
+import io
 import os
 import sys
+from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
@@ -21,6 +23,7 @@ from model.master_ledger import (
     create_empty_master_df,
     save_master_to_bytes,
     make_dataframe_arrow_compatible,
+    LEDGER_COLUMNS,
 )
 
 
@@ -55,6 +58,22 @@ def test_update_parent_child_master_adds_new_record():
     assert row['Total Entities'] == 5
 
 
+def test_update_parent_child_master_empty_ledger_keeps_column_order_and_dtypes():
+    """行の無い台帳への初回取り込みでも、台帳の列順・object dtype・連番インデックスを保つ。"""
+    master_df = create_empty_master_df()[['Child', 'Parent', 'Note']]
+    pairs = [
+        {'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用'},
+        {'main_drawing': 'C1', 'source_drawing': None},
+    ]
+    updated, added_count = update_parent_child_master(master_df, pairs)
+    assert added_count == 2
+    assert list(updated.columns[:3]) == ['Child', 'Parent', 'Note']
+    assert 'Relation' in updated.columns and 'Deleted Entities' in updated.columns
+    assert all(dtype == object for dtype in updated.dtypes)
+    assert list(updated.index) == [0, 1]
+    assert list(updated['Parent']) == ['A1', 'none']
+
+
 def test_update_parent_child_master_skips_pair_without_child():
     master_df = create_empty_master_df()
     pair = {'main_drawing': None, 'source_drawing': 'A1'}
@@ -63,6 +82,14 @@ def test_update_parent_child_master_skips_pair_without_child():
     assert len(updated) == 0
 
 
+def test_update_parent_child_master_nothing_to_update_returns_ledger_without_copy():
+    master_df = create_empty_master_df()
+    for new_pairs in ([], [{'main_drawing': None, 'source_drawing': 'A1'}]):
+        updated, added_count = update_parent_child_master(master_df, new_pairs)
+        assert updated is master_df
+        assert added_count == 0
+
+
 def test_update_parent_child_master_no_futurewarning_setting_na_on_numeric_column():
     """完全新規図面の先行登録（entity_counts 未確定 → 数値カラムが NaN のみで
     float64 として残る）の後、create_diff_zip() 側の2回目の update 呼び出しで
@@ -107,6 +134,63 @@ def test_update_parent_child_master_existing_record_relation_changed_suffix():
     assert row['Relation'] == 'RevUp-changed'
 
 
+def test_update_parent_child_master_same_pair_twice_in_batch_added_once():
+    """同一バッチ内で同じ (Parent, Child) の組が複数回渡された場合（同じDXFの
+    重複アップロード等）、台帳には最初の1件だけが追加される。既存行の更新は
+    重複行を含めて全該当行に反映される。"""
+    master_df = create_empty_master_df()
+    pairs = [
+        {'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用', 'title': 'first'},
+        {'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用', 'title': 'second'},
+        {'main_drawing': 'C1', 'source_drawing': 'A1', 'relation': '流用'},
+    ]
+    updated, added_count = update_parent_child_master(master_df, pairs)
+    assert added_count == 2
+    assert updated['Child'].tolist() == ['B1', 'C1']
+    assert updated.iloc[0]['Title'] == 'first'
+
+    duplicated = pd.concat([updated, updated.iloc[[0]]], ignore_index=True)
+    refreshed, added_count = update_parent_child_master(
+        duplicated, [{'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用', 'title': 'new'}])
+    assert added_count == 0
+    assert refreshed.loc[refreshed['Child'] == 'B1', 'Title'].tolist() == ['new', 'new']
+
+
+def test_update_parent_child_master_batch_shares_recorded_date():
+    """1回の更新で追加・更新される行の Recorded Date は同一の値になる。"""
+    master_df, _ = update_parent_child_master(
+        create_empty_master_df(), [{'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用'}])
+    pairs = [
+        {'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用'},
+        {'main_drawing': 'C1', 'source_drawing': 'A1', 'relation': '流用'},
+        {'main_drawing': 'D1', 'source_drawing': None},
+    ]
+    updated, added_count = update_parent_child_master(master_df, pairs)
+    assert added_count == 2
+    assert updated['Recorded Date'].nunique() == 1
+
+
+def test_update_parent_child_master_existing_record_with_all_empty_text_columns():
+    """読み込んだ台帳の Relation/Title/Subtitle/Recorded Date 列が全て空欄（float64）でも
+    既存行を更新できる（重複行はすべて更新される）。"""
+    master_df = pd.DataFrame({
+        'Child': ['B1', 'B1', 'C1'],
+        'Parent': ['A1', 'A1', 'A1'],
+        'Relation': [float('nan')] * 3,
+        'Title': [float('nan')] * 3,
+        'Subtitle': [float('nan')] * 3,
+        'Recorded Date': [float('nan')] * 3,
+    })
+    pairs = [{'main_drawing': 'B1', 'source_drawing': 'A1', 'relation': '流用',
+              'title': 'タイトル', 'subtitle': 'サブ'}]
+    updated, added_count = update_parent_child_master(master_df, pairs)
+    assert added_count == 0
+    assert list(updated['Title'])[:2] == ['タイトル', 'タイトル']
+    assert list(updated['Relation'])[:2] == ['流用', '流用']
+    assert pd.isna(updated['Title'].iloc[2])
+    assert isinstance(updated['Recorded Date'].iloc[0], datetime)
+
+
 # --- load_parent_child_master ---
 
 def test_load_parent_child_master_missing_required_column(tmp_path):
@@ -125,6 +209,32 @@ def test_load_parent_child_master_success(tmp_path):
     assert len(df) == 1
 
 
+def test_load_parent_child_master_completes_ledger_columns(tmp_path):
+    """読み込み時に標準カラムを補完し、旧 'Date' 列を 'Recorded Date' にリネームする。
+    全て空欄の列・エンティティ数カラムは object dtype に揃える。"""
+    path = tmp_path / "master.xlsx"
+    pd.DataFrame({'Child': ['B1'], 'Parent': ['A1'], 'Date': ['2024-01-01'],
+                  'Title': [None], 'Total Entities': [5]}).to_excel(path, index=False)
+    df, error = load_parent_child_master(str(path))
+    assert error is None
+    assert 'Date' not in df.columns
+    assert df['Recorded Date'].iloc[0] == '2024-01-01'
+    assert set(LEDGER_COLUMNS) <= set(df.columns)
+    assert df['Title'].dtype == object
+    assert df['Total Entities'].dtype == object
+
+
+def test_load_parent_child_master_reads_child_parent_as_strings(tmp_path):
+    """数字のみの図番も数値化されず文字列として読み込まれる（台帳の照合キーを
+    文字列で一貫させるため）。"""
+    path = tmp_path / "master.xlsx"
+    pd.DataFrame({'Child': ['B1', 12345], 'Parent': ['A1', None]}).to_excel(path, index=False)
+    df, error = load_parent_child_master(str(path))
+    assert error is None
+    assert df['Child'].tolist() == ['B1', '12345']
+    assert df['Parent'].iloc[0] == 'A1' and pd.isna(df['Parent'].iloc[1])
+
+
 def test_load_parent_child_master_finds_data_sheet_when_first_sheet_has_no_child_column(tmp_path):
     """save_master_to_bytes() が出力する台帳（Summaryシートが先頭）を再アップロード
     しても、Child/Parent 列を持つシート（Diff List）を自動で見つけて読み込める。
@@ -149,7 +259,7 @@ def test_load_parent_child_master_finds_data_sheet_when_first_sheet_has_no_child
     assert list(df['Parent']) == ['A1']
 
 
-def test_save_master_to_bytes_round_trip_reloads_correctly(tmp_path):
+def test_save_master_to_bytes_round_trip_reloads_correctly():
     """save_master_to_bytes() の出力をそのまま load_parent_child_master() で
     再読み込みできる（エクスポート→再アップロードの往復を保証する）。"""
     master_df = create_empty_master_df()
@@ -161,16 +271,40 @@ def test_save_master_to_bytes_round_trip_reloads_correctly(tmp_path):
     }
     data = save_master_to_bytes(master_df, pairs=[], mode='auto', total_drawings_count=1)
 
-    path = tmp_path / "roundtrip.xlsx"
-    path.write_bytes(data)
-
-    df, error = load_parent_child_master(str(path))
+    # アップロードされたファイルと同じくファイルオブジェクトとして渡す（ディスクを経由しない）
+    df, error = load_parent_child_master(io.BytesIO(data))
     assert error is None
     assert df is not None
     assert list(df['Child']) == ['B1']
     assert list(df['Parent']) == ['A1']
 
 
+def test_load_parent_child_master_same_result_with_and_without_calamine(tmp_path, monkeypatch):
+    """calamine が無い環境（pandas 既定の openpyxl）でも同じ台帳として読み込める。"""
+    import model.master_ledger as master_ledger
+    master_df = create_empty_master_df()
+    master_df.loc[0] = {
+        'Child': '0012', 'Parent': 'A1', 'Relation': '流用',
+        'Title': 'T', 'Subtitle': None, 'Recorded Date': datetime(2026, 7, 1, 9, 30), 'Note': None,
+        'Deleted Entities': 1, 'Added Entities': 2, 'Diff Entities': 3,
+        'Unchanged Entities': 4, 'Total Entities': 5,
+    }
+    path = tmp_path / "engine.xlsx"
+    path.write_bytes(save_master_to_bytes(master_df, pairs=[], mode='auto', total_drawings_count=1))
+
+    df_default, error = load_parent_child_master(str(path))
+    assert error is None
+    monkeypatch.setattr(master_ledger, 'get_excel_read_engine', lambda: None)
+    df_openpyxl, error = load_parent_child_master(str(path))
+    assert error is None
+
+    assert list(df_default.columns) == list(df_openpyxl.columns)
+    assert df_default['Child'].iloc[0] == df_openpyxl['Child'].iloc[0] == '0012'
+    for col in ('Parent', 'Relation', 'Title', 'Added Entities', 'Total Entities'):
+        assert df_default[col].iloc[0] == df_openpyxl[col].iloc[0], col
+    assert pd.Timestamp(df_default['Recorded Date'].iloc[0]) == pd.Timestamp(df_openpyxl['Recorded Date'].iloc[0])
+
+
 def test_uploaded_master_merges_correctly_across_all_pairing_modes(tmp_path):
     """Step0でアップロードした台帳（Summary+Diff List形式）が、Step1のどの
     ペアリング方式（Type A/B の RevUp・流用、Type C のペアリスト）で得られた
@@ -253,7 +387,7 @@ def test_save_master_to_bytes_sorts_diff_list_by_child():
         }
 
     data = save_master_to_bytes(master_df, pairs=[], mode='pair_list', total_drawings_count=3)
-    diff_list_df = pd.read_excel(pd.io.common.BytesIO(data), sheet_name='Diff List')
+    diff_list_df = pd.read_excel(io.BytesIO(data), sheet_name='Diff List')
     assert list(diff_list_df['Child']) == ['DE5313-008-02A', 'EE3273-608-24B', 'EE3273-608-32B']
     # 元の master_df は変更されない（呼び出し元の順序に副作用を与えない）
     assert list(master_df['Child']) == ['EE3273-608-32B', 'EE3273-608-24B', 'DE5313-008-02A']
@@ -272,6 +406,57 @@ def test_save_master_to_bytes_handles_na_entity_strings():
     assert isinstance(data, bytes) and len(data) > 0
 
 
+def test_save_master_to_bytes_constant_memory_keeps_every_column():
+    """constant_memory モード（行単位の書き出し）でも Diff List の全列・全行が
+    失われずに出力される。to_excel() は列単位で書き込むため、このモードで使うと
+    最後の列以外が空になる（回帰防止）。"""
+    master_df = create_empty_master_df()
+    recorded = datetime(2026, 7, 1, 12, 30, 0)
+    master_df.loc[0] = {
+        'Child': 'B1', 'Parent': 'A1', 'Relation': '流用',
+        'Title': 'T', 'Subtitle': None, 'Recorded Date': recorded, 'Note': 'memo',
+        'Deleted Entities': 1, 'Added Entities': 2, 'Diff Entities': 3,
+        'Unchanged Entities': 4, 'Total Entities': 7,
+    }
+    master_df.loc[1] = {
+        'Child': 'C1', 'Parent': 'none', 'Relation': '完全新規図面',
+        'Title': None, 'Subtitle': None, 'Recorded Date': recorded, 'Note': None,
+        'Deleted Entities': 'n/a', 'Added Entities': 5, 'Diff Entities': 'n/a',
+        'Unchanged Entities': 'n/a', 'Total Entities': 5,
+    }
+
+    data = save_master_to_bytes(master_df, pairs=[], mode='auto', total_drawings_count=2)
+    df = pd.read_excel(io.BytesIO(data), sheet_name='Diff List', keep_default_na=False)
+
+    assert list(df.columns) == list(master_df.columns)
+    assert df['Child'].tolist() == ['B1', 'C1']
+    assert df['Parent'].tolist() == ['A1', 'none']
+    assert df['Note'].tolist() == ['memo', '']
+    assert df['Deleted Entities'].tolist() == [1, 'n/a']
+    assert df['Total Entities'].tolist() == [7, 5]
+    assert df['Recorded Date'].tolist() == [recorded, recorded]
+
+
+def test_save_master_to_bytes_writes_formula_and_url_like_text_as_strings():
+    """"=" で始まるタイトルや URL 風の Note も数式・ハイパーリンクにせず文字列で書く。"""
+    import openpyxl
+    master_df = create_empty_master_df()
+    master_df.loc[0] = {
+        'Child': 'B1', 'Parent': 'A1', 'Relation': '流用',
+        'Title': '=SUM(A1)', 'Subtitle': None, 'Recorded Date': None, 'Note': 'http://example.com',
+        'Deleted Entities': 1, 'Added Entities': 2, 'Diff Entities': 3,
+        'Unchanged Entities': 4, 'Total Entities': 7,
+    }
+
+    data = save_master_to_bytes(master_df, pairs=[], mode='auto', total_drawings_count=1)
+    ws = openpyxl.load_workbook(io.BytesIO(data))['Diff List']
+    header = [c.value for c in ws[1]]
+    title_cell = ws.cell(row=2, column=header.index('Title') + 1)
+    note_cell = ws.cell(row=2, column=header.index('Note') + 1)
+    assert (title_cell.data_type, title_cell.value) == ('s', '=SUM(A1)')
+    assert note_cell.value == 'http://example.com' and note_cell.hyperlink is None
+
+
 # --- make_dataframe_arrow_compatible ---
 
 def test_make_dataframe_arrow_compatible_mixed_entity_columns():
@@ -70,6 +70,11 @@ def test_extract_base_no_revision():
     assert extract_base_drawing_number('A') == (None, None)
 
 
+def test_extract_base_lowercase_or_digit_suffix_is_not_revision():
+    assert extract_base_drawing_number('DE5313-008-02b') == (None, None)
+    assert extract_base_drawing_number('DE5313-008-02２') == (None, None)
+
+
 # --- find_revup_pairs ---
 
 def test_find_revup_consecutive():